@@ -0,0 +1,104 @@
+import random
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from .models import Auction
+from . import events
+
+
+# retries when the database is busy (SQLite "database is locked"), with exponential backoff
+MAX_ATTEMPTS = 5
+BACKOFF = 0.01
+
+CENT = Decimal("0.01")
+
+# highest amount the price fields can store, larger values would be unreadable once saved
+_price_field = Auction._meta.get_field("proposed_price")
+MAX_AMOUNT = Decimal(10) ** (_price_field.max_digits - _price_field.decimal_places) - CENT
+
+
+class BidError(Exception):
+    """Base class of the reasons a bid is refused, the message is shown to the user."""
+
+class InvalidAmount(BidError):
+    pass
+
+class AuctionNotFound(BidError):
+    pass
+
+class AuctionClosed(BidError):
+    pass
+
+class BidTooLow(BidError):
+    pass
+
+
+def parse_amount(value):
+    """Convert a submitted amount into a Decimal with 2 decimal places.
+
+    Raises:
+        InvalidAmount: if the value is not a positive number the price fields can store.
+    """
+    try:
+        amount = Decimal(str(value).strip()).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise InvalidAmount("Please enter a valid amount!")
+    if not amount.is_finite() or amount <= 0:
+        raise InvalidAmount("Please enter a valid amount!")
+    if amount > MAX_AMOUNT:
+        raise InvalidAmount(f"The amount cannot be higher than ${MAX_AMOUNT}!")
+    return amount
+
+
+def _refusal(auction_id, amount):
+    """Explain why the conditional update of an auction matched no row."""
+    auction = (Auction.objects.filter(pk=auction_id)
+               .only("active", "end_time", "price", "proposed_price").first())
+    if auction is None:
+        return AuctionNotFound("The auction you tried to bid on does not exist!")
+    if not auction.active or (auction.end_time is not None and auction.end_time <= timezone.now()):
+        return AuctionClosed("This auction is closed!")
+    if amount < auction.price:
+        return BidTooLow("The amount you want to bid should be higher than the initial price!")
+    return BidTooLow("The amount you want to bid should be higher than the current bid!")
+
+
+def place_bid(auction_id, bidder, value):
+    """Place a bid on an auction.
+
+    The price is only raised by a conditional UPDATE (WHERE proposed_price < amount), so
+    concurrent bidders cannot both win: the database applies one update after the other and
+    the lower bid no longer matches. Busy database errors are retried with backoff. Accepted
+    bids are published to the listeners of the auction.
+
+    Args:
+        auction_id (int): id of the auction.
+        bidder (User): user placing the bid.
+        value (str): submitted amount.
+
+    Returns:
+        Decimal: the amount of the accepted bid.
+
+    Raises:
+        BidError: subclass describing why the bid was refused.
+    """
+    amount = parse_amount(value)
+    auction = Auction(pk=auction_id)
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                if auction.record_bid(bidder, amount):
+                    bid_count = Auction.objects.filter(pk=auction_id).values_list("bid_count", flat=True).get()
+                    events.publish([(auction_id, "bid", {
+                        "price": str(amount), "bid_count": bid_count, "bidder": bidder.username,
+                    })])
+                    return amount
+            raise _refusal(auction_id, amount)
+        except OperationalError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
@@ -0,0 +1,77 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Auction, Bid, Category
+from . import events
+
+
+# number of auctions closed by each transaction of the scheduler
+BATCH_SIZE = 1000
+
+
+def _close(auctions, limit=None):
+    """Close a queryset of active auctions and settle their winners, see settle()."""
+    features = connection.features
+    highest = Bid.objects.filter(auction=OuterRef("pk")).order_by("-offer", "date", "id")
+
+    with transaction.atomic():
+        # lock the auctions, several schedulers skip the rows another one is closing
+        if features.has_select_for_update:
+            auctions = auctions.select_for_update(skip_locked=features.has_select_for_update_skip_locked)
+        closing = list(auctions.values_list("id", "category_id")[:limit])
+        if not closing:
+            return 0
+
+        Auction.objects.filter(id__in=[id for id, _ in closing]).update(
+            active=False,
+            winner=Subquery(highest.values("bidder")[:1]),
+            proposed_price=Subquery(highest.values("offer")[:1]),
+        )
+        closed = Counter(category_id for _, category_id in closing)
+        Category.adjust_counts({category_id: -count for category_id, count in closed.items()})
+
+        # tell the listeners of the auctions who won them
+        settled = Auction.objects.filter(id__in=[id for id, _ in closing]).values_list(
+            "id", "price", "proposed_price", "winner__username"
+        )
+        events.publish(
+            (id, "close", {"price": str(proposed_price or price), "winner": winner})
+            for id, price, proposed_price, winner in settled
+        )
+    return len(closing)
+
+
+def settle(ids):
+    """Close the active auctions of the given ids and settle their winners.
+
+    The winner and the final price of each auction are taken from its highest bid (the earliest
+    one on a tie), auctions without bids close without winner. They are all changed by a single
+    UPDATE, and the category counters are adjusted and close events published in the same
+    transaction.
+
+    Returns:
+        Int: the number of auctions closed, auctions already closed are left as they are.
+    """
+    return _close(Auction.objects.by_status(True).filter(id__in=list(ids)))
+
+
+def close_due(now=None, limit=BATCH_SIZE):
+    """Close and settle up to `limit` active auctions whose end time is past, oldest first.
+
+    The due auctions are read from the (active, end_time) index.
+
+    Returns:
+        Int: the number of auctions closed.
+    """
+    now = now or timezone.now()
+    due = Auction.objects.by_status(True).filter(end_time__lte=now).order_by("end_time", "id")
+    return _close(due, limit)
+
+
+def next_end_time():
+    """Return the end time of the next active auction to close, or None."""
+    return (Auction.objects.by_status(True).filter(end_time__isnull=False)
+            .order_by("end_time").values_list("end_time", flat=True).first())
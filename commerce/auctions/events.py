@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import AuctionEvent
+
+
+# identifies the events published by this process
+PROCESS_ID = uuid.uuid4().hex
+
+# how often each process reads the events published by the other ones, and how long they are kept
+POLL_INTERVAL = getattr(settings, "AUCTIONS_EVENTS_POLL_INTERVAL", 0.5)
+RETENTION = timedelta(minutes=5)
+
+# events waiting for a slow listener, the oldest ones are dropped beyond that
+QUEUE_SIZE = 16
+
+
+def _offer(queue, event):
+    # runs in the event loop of the listener
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class Hub:
+    """In-process publish/subscribe of the events of each auction.
+
+    Listeners are asyncio queues read by the event streams of this process. Events are published
+    from worker threads, so they are handed to the event loop of each queue.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = defaultdict(dict)
+
+    def subscribe(self, auction_id):
+        """Return a queue receiving the events of an auction, must be called in an event loop."""
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._listeners[auction_id][queue] = asyncio.get_running_loop()
+        relay.start()
+        return queue
+
+    def unsubscribe(self, auction_id, queue):
+        with self._lock:
+            listeners = self._listeners.get(auction_id, {})
+            listeners.pop(queue, None)
+            if not listeners:
+                self._listeners.pop(auction_id, None)
+
+    def watched(self):
+        """Return the ids of the auctions with listeners in this process."""
+        with self._lock:
+            return list(self._listeners)
+
+    def deliver(self, auction_id, event):
+        with self._lock:
+            listeners = list(self._listeners.get(auction_id, {}).items())
+        for queue, loop in listeners:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # the loop was closed, its listener is gone
+                pass
+
+
+class Relay:
+    """Thread delivering the events published by other processes (web workers, the closing
+    scheduler) to the listeners of this one.
+
+    The database table of events stands in for a message broker: each process reads the new rows
+    every POLL_INTERVAL seconds with a single query, whatever its number of listeners.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="auction-events", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        last = None
+        while True:
+            try:
+                last = self.poll(last)
+                prune()
+            except DatabaseError:
+                # the database is busy or unreachable, try again on the next poll
+                pass
+            finally:
+                close_old_connections()
+            time.sleep(POLL_INTERVAL)
+
+    def poll(self, last):
+        """Deliver the events published by other processes after the event id `last`.
+
+        Returns:
+            Int: the id of the last event seen.
+        """
+        newest = AuctionEvent.objects.aggregate(last=Max("id"))["last"] or 0
+        if last is None or newest <= last:
+            return newest
+
+        watched = hub.watched()
+        if watched:
+            rows = (AuctionEvent.objects.filter(id__gt=last, id__lte=newest, auction_id__in=watched)
+                    .exclude(origin=PROCESS_ID).order_by("id")
+                    .values_list("auction_id", "kind", "data"))
+            for auction_id, kind, data in rows:
+                hub.deliver(auction_id, {"kind": kind, **data})
+        return newest
+
+
+hub = Hub()
+relay = Relay()
+
+_pruned_lock = threading.Lock()
+_pruned = None
+
+
+def prune():
+    """Delete the events older than RETENTION, at most once every RETENTION in each process.
+
+    Called by every process publishing or relaying events, so the table stays bounded even when
+    no stream is listening (WSGI servers, the closing scheduler).
+    """
+    global _pruned
+    with _pruned_lock:
+        if _pruned is not None and time.monotonic() - _pruned < RETENTION.total_seconds():
+            return
+        _pruned = time.monotonic()
+    AuctionEvent.objects.filter(created__lt=timezone.now() - RETENTION).delete()
+
+
+def publish(events):
+    """Publish (auction id, kind, data) events, from the transaction that made them happen.
+
+    The events are stored for the other processes, and handed to the listeners of this process
+    once the transaction commits, so an event never announces a change that was rolled back.
+    """
+    events = list(events)
+    if not events:
+        return
+    AuctionEvent.objects.bulk_create([
+        AuctionEvent(auction_id=auction_id, kind=kind, data=data, origin=PROCESS_ID)
+        for auction_id, kind, data in events
+    ])
+
+    def deliver():
+        for auction_id, kind, data in events:
+            hub.deliver(auction_id, {"kind": kind, **data})
+        try:
+            prune()
+        except DatabaseError:
+            # the change is committed already, leave the old events to the next prune
+            pass
+    transaction.on_commit(deliver)
+
+
+def state(auction):
+    """Return the event describing the current state of an auction, sent when a stream opens."""
+    return {
+        "kind": "state",
+        "price": str(auction.proposed_price or auction.price),
+        "bid_count": auction.bid_count,
+        "active": auction.active,
+        "winner": auction.winner.username if auction.winner_id else None,
+    }
+
+
+def format_event(event):
+    """Serialize an event in the Server-Sent Events format."""
+    return f"event: {event['kind']}\ndata: {json.dumps(event)}\n\n"
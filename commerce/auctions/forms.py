@@ -1,10 +1,11 @@
 from django import forms
+from django.utils import timezone
 from .models import Auction
 
 class AuctionForm(forms.ModelForm):
     class Meta:
         model = Auction
-        fields = ['item', 'description', 'price', 'image', 'category']
+        fields = ['item', 'description', 'price', 'image', 'category', 'end_time']
         
         widgets = {
             'item': forms.TextInput(attrs={'class': 'form-control mb-2 mt-1'}),
@@ -12,6 +13,7 @@ class AuctionForm(forms.ModelForm):
             'image': forms.URLInput(attrs={'class': 'form-control mb-2 mt-1'}),
             'price': forms.NumberInput(attrs={'class': 'form-control mb-2 mt-1'}),
             'category': forms.Select(attrs={'class': 'form-control mb-2 mt-1'}),
+            'end_time': forms.DateTimeInput(attrs={'class': 'form-control mb-2 mt-1', 'type': 'datetime-local'}),
         }
     
     def __init__(self, *args, **kwargs):
@@ -19,4 +21,11 @@ class AuctionForm(forms.ModelForm):
         
         # no requiered categories, automaticly set up to "Other" if no specified.
         self.fields['category'].required = False
+        self.fields['end_time'].help_text = "Leave empty to close the auction yourself."
+
+    def clean_end_time(self):
+        end_time = self.cleaned_data.get('end_time')
+        if end_time is not None and end_time <= timezone.now():
+            raise forms.ValidationError("The end time must be in the future.")
+        return end_time
 
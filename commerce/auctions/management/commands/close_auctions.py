@@ -0,0 +1,67 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from auctions import closing
+
+
+# shortest wait between two checks, auctions past their end time that could not be closed (locked
+# by another scheduler) would otherwise be checked again without pause
+MIN_WAIT = 0.1
+
+
+class Command(BaseCommand):
+    help = ("Closes the auctions whose end time is past and settles their winners, "
+            "then keeps waiting for the next ones unless --once is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=closing.BATCH_SIZE,
+                            help="Auctions closed by each transaction.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Longest wait in seconds between two checks for due auctions.")
+        parser.add_argument("--once", action="store_true",
+                            help="Close the auctions due now and exit.")
+
+    def handle(self, *args, **options):
+        self.running = True
+        if not options["once"]:
+            # finish the current batch before exiting
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        while self.running:
+            close_old_connections()
+            closed = self.close_due(options["batch_size"])
+            if closed:
+                self.stdout.write(f"Closed {closed} auctions.")
+            if options["once"]:
+                break
+            self.wait(options["interval"])
+
+    def close_due(self, batch_size):
+        # a full batch means more auctions may be due, keep going without waiting
+        total = 0
+        now = timezone.now()
+        while self.running:
+            closed = closing.close_due(now, batch_size)
+            total += closed
+            if closed < batch_size:
+                break
+        return total
+
+    def wait(self, interval):
+        # sleep until the next end time, checking at least every `interval` seconds
+        # to see auctions created meanwhile, and waking up early to exit
+        next_end = closing.next_end_time()
+        delay = interval
+        if next_end is not None:
+            delay = min(interval, max((next_end - timezone.now()).total_seconds(), MIN_WAIT))
+        deadline = time.monotonic() + delay
+        while self.running and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
+
+    def stop(self, signum, frame):
+        self.running = False
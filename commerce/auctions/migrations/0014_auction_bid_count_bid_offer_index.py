@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:46
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_bids(apps, schema_editor):
+    Auction = apps.get_model("auctions", "Auction")
+    for auction in Auction.objects.annotate(count=Count("bids")).filter(count__gt=0):
+        Auction.objects.filter(pk=auction.pk).update(bid_count=auction.count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_alter_auction_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', '-offer'], name='auctions_bi_auction_a75265_idx'),
+        ),
+        migrations.RunPython(count_bids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_auction_bid_count_bid_offer_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['active', 'creation_date'], name='auctions_au_active_f6c630_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['category', 'active', 'creation_date'], name='auctions_au_categor_4ab614_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['seller', 'creation_date'], name='auctions_au_seller__d784e8_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # the full-text index only exists on SQLite, other databases search with LIKE
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE auctions_auction_fts USING fts5("
+        "item, description, category, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO auctions_auction_fts (rowid, item, description, category) "
+        "SELECT a.id, a.item, a.description, COALESCE(c.name, '') "
+        "FROM auctions_auction a LEFT JOIN auctions_category c ON c.id = a.category_id"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS auctions_auction_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_auction_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_active_auctions(apps, schema_editor):
+    Category = apps.get_model("auctions", "Category")
+    counted = Category.objects.annotate(
+        count=Count("sorted_auctions", filter=Q(sorted_auctions__active=True))
+    ).filter(count__gt=0)
+    for category in counted:
+        Category.objects.filter(pk=category.pk).update(active_count=category.count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_auction_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_active_auctions, migrations.RunPython.noop),
+    ]
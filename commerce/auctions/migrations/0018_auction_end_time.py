@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0017_category_active_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['active', 'end_time'], name='auctions_au_active_b638b9_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_auction_end_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionEvent',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=10)),
+                ('data', models.JSONField()),
+                ('origin', models.CharField(max_length=32)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='auctions.auction')),
+            ],
+        ),
+    ]
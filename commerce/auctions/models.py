@@ -1,5 +1,10 @@
+from collections import Counter
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -8,13 +13,105 @@ class User(AbstractUser):
 class Category(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=50, unique=True)
+    # number of active auctions in the category, kept up to date when auctions are saved or deleted
+    active_count = models.PositiveIntegerField(default=0)
+
+    # category given to auctions created without one, its id is kept in the shared cache
+    DEFAULT_NAME = 'Not categorized'
+    DEFAULT_CACHE_KEY = 'auctions:default_category'
+    DEFAULT_CACHE_TTL = 3600
+
+    # the categories page is served from the cache for CACHE_TTL seconds
+    CACHE_KEY = 'auctions:categories'
+    CACHE_TTL = 30
 
     class Meta:
         ordering = ['name'] 
 
+    @classmethod
+    def default_id(cls):
+        """Return the id of the default category, only queried when it is not in the cache.
+
+        The id is kept in the cache shared by the worker processes (see CACHES), so when the
+        category is deleted none of them keeps using its id.
+        """
+        default_id = cache.get(cls.DEFAULT_CACHE_KEY)
+        if default_id is None:
+            category, created = cls.objects.get_or_create(name=cls.DEFAULT_NAME)
+            default_id = category.id
+            # a category created by a transaction that is rolled back must not be cached
+            transaction.on_commit(lambda: cache.set(cls.DEFAULT_CACHE_KEY, default_id, cls.DEFAULT_CACHE_TTL))
+        return default_id
+
+    @classmethod
+    def clear_default(cls):
+        """Forget the cached default category id in every process, it is resolved again on next use.
+
+        It is forgotten again once the current transaction commits, in case another process
+        cached the id of a category being deleted meanwhile.
+        """
+        cache.delete(cls.DEFAULT_CACHE_KEY)
+        transaction.on_commit(lambda: cache.delete(cls.DEFAULT_CACHE_KEY))
+
+    @classmethod
+    def adjust_counts(cls, changes):
+        """Add the changes of a {category id: change} mapping to the active auction counters.
+
+        The counters are incremented in the database, so concurrent changes add up, and the
+        cached categories are dropped once the transaction commits.
+        """
+        for category_id, change in changes.items():
+            if category_id is not None and change:
+                cls.objects.filter(id=category_id).update(active_count=F("active_count") + change)
+        transaction.on_commit(lambda: cache.delete(cls.CACHE_KEY))
+
+    @classmethod
+    def cached(cls):
+        """Return the list of categories with their active auction counts, from the cache if possible."""
+        categories = cache.get(cls.CACHE_KEY)
+        if categories is None:
+            categories = list(cls.objects.all())
+            cache.set(cls.CACHE_KEY, categories, cls.CACHE_TTL)
+        return categories
+
     def __str__(self):
         return f"{self.name}"
 
+class AuctionManager(models.Manager):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), give the default category to the auctions without one
+        objs = list(objs)
+        for auction in objs:
+            if auction.category_id is None:
+                auction.category_id = Category.default_id()
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            Category.adjust_counts(Counter(auction.category_id for auction in objs if auction.active))
+
+        # nor does it send post_save, index the new auctions for search here
+        from .search import index_auctions
+        index_auctions(auction.id for auction in objs if auction.id is not None)
+        return objs
+
+    def by_status(self, active):
+        """Open (active=True) or closed (active=False) auctions.
+
+        Django writes `active=True` as a bare `WHERE active` that SQLite cannot look up in an
+        index, `active IN (...)` lets the feeds seek the (active, creation_date) indexes.
+        """
+        return self.filter(active__in=[active])
+
+    def with_details(self):
+        """Auctions with everything the listing page displays, fetched in a single query.
+
+        The seller, winner and category are joined.
+        """
+        return self.select_related("seller", "winner", "category")
+
+# fields of an auction that the active auction counters of the categories depend on
+COUNTED_FIELDS = {"active", "category", "category_id"}
+
 class Auction(models.Model):
     id = models.AutoField(primary_key=True, null=False)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sales", null=False)
@@ -24,22 +121,93 @@ class Auction(models.Model):
     description = models.CharField(max_length=255)
     image = models.URLField(max_length=300, null=True, blank=True, default='https://paytmblogcdn.paytm.com/wp-content/uploads/2024/04/Blog_Generic_Difference-Between-Hallmarked-Gold-KDM-and-916-Gold.jpg')
     creation_date = models.DateTimeField(auto_now_add=True)
+    # when the auction closes by itself, never if empty (the seller closes it)
+    end_time = models.DateTimeField(null=True, blank=True)
     category = models.ForeignKey(Category, null=True, on_delete=models.SET_NULL, related_name="sorted_auctions")
     active = models.BooleanField(default=True)
     winner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="won_auctions", null=True)
+    # number of bids placed, kept up to date by record_bid
+    bid_count = models.PositiveIntegerField(default=0)
+
+    objects = AuctionManager()
     
 
     # when querying the objects, order the items by creation_date (last created comes first)
+    # the indexes serve the paginated feeds, which filter on these columns and seek on creation_date
     class Meta:
         ordering = ['-creation_date']
+        indexes = [
+            models.Index(fields=['active', 'creation_date']),
+            models.Index(fields=['category', 'active', 'creation_date']),
+            models.Index(fields=['seller', 'creation_date']),
+            models.Index(fields=['active', 'end_time']),
+        ]
     
     def save(self, *args, **kwargs):
         
-        # Update the category to "Other" if no categories are selected
-        default_category, created = Category.objects.get_or_create(name='Not categorized')
-        if not self.category:
-            self.category = default_category
-        super().save(*args, **kwargs)
+        # Update the category to the default one only if no categories are selected
+        if self.category_id is None:
+            self.category_id = Category.default_id()
+
+        # saves that change neither the status nor the category leave the counters as they are
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not COUNTED_FIELDS.intersection(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            # lock the row so concurrent saves of the auction count its previous state once
+            previous = None
+            if not self._state.adding:
+                previous = (Auction.objects.select_for_update().filter(pk=self.pk)
+                            .values_list("category_id", "active").first())
+            super().save(*args, **kwargs)
+
+            changes = Counter()
+            category_id, active = self.category_id, self.active
+            if previous is not None:
+                if previous[1]:
+                    changes[previous[0]] -= 1
+                # fields left out of update_fields keep their stored value
+                if update_fields is not None:
+                    if not {"category", "category_id"}.intersection(update_fields):
+                        category_id = previous[0]
+                    if "active" not in update_fields:
+                        active = previous[1]
+            if active:
+                changes[category_id] += 1
+            Category.adjust_counts(changes)
+
+    def record_bid(self, bidder, offer):
+        """Store a bid and update the denormalized bid fields of the auction.
+
+        The current price (proposed_price), the leader (winner) and bid_count are changed by
+        one conditional UPDATE that only matches an active, not yet ended auction whose current
+        price is lower than the offer, so they stay consistent with the Bid rows even when bids
+        race, and no bid lands between the end time and the closing of the auction.
+
+        Returns:
+            Bool: False if the offer is refused, nothing is stored then.
+        """
+        with transaction.atomic():
+            updated = Auction.objects.filter(
+                Q(proposed_price__isnull=True) | Q(proposed_price__lt=offer),
+                Q(end_time__isnull=True) | Q(end_time__gt=timezone.now()),
+                pk=self.pk,
+                active=True,
+                price__lte=offer
+            ).update(
+                proposed_price=offer,
+                winner=bidder,
+                bid_count=F("bid_count") + 1
+            )
+            if not updated:
+                return False
+            Bid.objects.create(bidder=bidder, auction_id=self.pk, offer=offer)
+
+        self.proposed_price = offer
+        self.winner = bidder
+        return True
 
     def __str__(self):
         return f"{self.item}"
@@ -51,6 +219,10 @@ class Bid(models.Model):
     offer = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
 
+    # highest bids of an auction first
+    class Meta:
+        indexes = [models.Index(fields=['auction', '-offer'])]
+
     def __str__(self):
         return f"{self.bidder} offered ${self.offer} on {self.auction}"
 
@@ -77,4 +249,17 @@ class Watchlist(models.Model):
         unique_together = ('user', 'auction') 
 
     
-    
\ No newline at end of file
+    
+
+class AuctionEvent(models.Model):
+    """A bid or close event, kept a few minutes so every worker process can relay it."""
+    id = models.AutoField(primary_key=True)
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name="events")
+    kind = models.CharField(max_length=10)
+    data = models.JSONField()
+    # process that published the event, it already delivered it to its own listeners
+    origin = models.CharField(max_length=32)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} event on {self.auction_id}"
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+
+# number of auctions displayed on each page of a feed
+AUCTIONS_PER_PAGE = 30
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(auction):
+    """Return the cursor pointing at an auction, made of its creation date and id."""
+    microseconds = (auction.creation_date - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}_{auction.id}"
+
+
+def decode_cursor(cursor):
+    """Return the (creation_date, id) pair of a cursor, or None if it is malformed."""
+    try:
+        microseconds, id = cursor.split("_")
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetPage:
+    """A page of auctions read from a position in the feed rather than from an offset.
+
+    Iterating over the page gives its auctions, `next` and `previous` are the cursors of the
+    neighbouring pages, or None at the ends of the feed.
+    """
+
+    def __init__(self, auctions, next=None, previous=None):
+        self.auctions = auctions
+        self.next = next
+        self.previous = previous
+
+    def __iter__(self):
+        return iter(self.auctions)
+
+    def __len__(self):
+        return len(self.auctions)
+
+    def __bool__(self):
+        return bool(self.auctions)
+
+
+def keyset_page(queryset, after=None, before=None, size=AUCTIONS_PER_PAGE):
+    """Return a page of auctions ordered by (-creation_date, -id).
+
+    The page starts right after the `after` cursor, or ends right before the `before` cursor.
+    The position is sought in the creation_date index instead of counting and skipping the previous
+    rows, so every page costs the same as the first one. The seek is written as a range on
+    creation_date minus the ties already seen, SQLite does not use an index for the equivalent OR.
+
+    Args:
+        queryset: the auctions of the feed, unordered.
+        after: cursor of the last auction of the previous page.
+        before: cursor of the first auction of the next page.
+        size: number of auctions per page.
+
+    Returns:
+        KeysetPage: the auctions of the page and the cursors of its neighbours.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before is not None:
+        # read the feed backwards from the cursor, then put the page back in order
+        date, id = before
+        rows = list(queryset.filter(creation_date__gte=date)
+                    .exclude(creation_date=date, id__lte=id)
+                    .order_by("creation_date", "id")[:size + 1])
+        more = len(rows) > size
+        auctions = rows[:size][::-1]
+        return KeysetPage(
+            auctions,
+            next=encode_cursor(auctions[-1]) if auctions else None,
+            previous=encode_cursor(auctions[0]) if more else None,
+        )
+
+    if after is not None:
+        date, id = after
+        queryset = queryset.filter(creation_date__lte=date).exclude(creation_date=date, id__gte=id)
+
+    # one extra row tells if there is a next page
+    rows = list(queryset.order_by("-creation_date", "-id")[:size + 1])
+    auctions = rows[:size]
+    return KeysetPage(
+        auctions,
+        next=encode_cursor(auctions[-1]) if len(rows) > size else None,
+        previous=encode_cursor(auctions[0]) if after is not None and auctions else None,
+    )
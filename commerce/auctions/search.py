@@ -0,0 +1,132 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Auction
+
+
+# FTS5 table holding the item, description and category name of every auction, its rowid is the
+# auction id. It is created by the 0016 migration on SQLite and kept in sync by auctions/signals.py
+TABLE = "auctions_auction_fts"
+
+# bm25 weights of the item, description and category columns, a match in the item counts most
+WEIGHTS = (10.0, 1.0, 4.0)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def is_available():
+    """Return True if the database has the full-text index, only SQLite has one."""
+    return connection.vendor == "sqlite"
+
+
+def match_query(text):
+    """Return the FTS5 query matching auctions that contain every word of `text`.
+
+    Words are quoted so the user cannot write FTS5 syntax, and the last one is a prefix so results
+    show up while the last word is being typed. Returns None if `text` has no words.
+    """
+    words = TOKEN_RE.findall(text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _reindex(condition, params=()):
+    # replace the indexed text of the auctions matching an SQL condition on auctions_auction
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE rowid IN (SELECT a.id FROM auctions_auction a WHERE {condition})",
+            params,
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, item, description, category) "
+            "SELECT a.id, a.item, a.description, COALESCE(c.name, '') "
+            "FROM auctions_auction a LEFT JOIN auctions_category c ON c.id = a.category_id "
+            f"WHERE {condition}",
+            params,
+        )
+
+
+def index_auctions(ids):
+    """Index or re-index the auctions of the given ids."""
+    ids = list(ids)
+    if is_available() and ids:
+        _reindex(f"a.id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def index_category(category_id):
+    """Re-index the auctions of a category, after it was renamed or deleted (category_id None)."""
+    if is_available():
+        if category_id is None:
+            _reindex("a.category_id IS NULL")
+        else:
+            _reindex("a.category_id = %s", [category_id])
+
+
+def remove_auction(id):
+    """Remove a deleted auction from the index."""
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [id])
+
+
+class SearchResults:
+    """Active auctions matching a query, best match first, to be given to a Paginator.
+
+    Only the slice of a page is fetched: the ranked ids come from the full-text index, then the
+    auctions from their primary key.
+    """
+
+    def __init__(self, query):
+        self.match = match_query(query)
+
+    def count(self):
+        if self.match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {TABLE} f JOIN auctions_auction a ON a.id = f.rowid "
+                f"WHERE {TABLE} MATCH %s AND a.active",
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("SearchResults only supports slicing")
+        if self.match is None:
+            return []
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {TABLE} f JOIN auctions_auction a ON a.id = f.rowid "
+                f"WHERE {TABLE} MATCH %s AND a.active "
+                f"ORDER BY bm25({TABLE}, %s, %s, %s), a.creation_date DESC LIMIT %s OFFSET %s",
+                [self.match, *WEIGHTS, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        auctions = Auction.objects.in_bulk(ids)
+        return [auctions[id] for id in ids if id in auctions]
+
+
+def search(query):
+    """Return the active auctions matching a query, ranked, for a Paginator.
+
+    Without a full-text index, falls back to a LIKE scan of the item, description and category,
+    most recent first.
+    """
+    if is_available():
+        return SearchResults(query)
+    return Auction.objects.by_status(True).filter(
+        Q(item__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query)
+    ).order_by("-creation_date", "-id")
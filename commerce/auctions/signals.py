@@ -1,9 +1,54 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
-from .models import Category
+from .models import Auction, Category, Watchlist
+from . import search, watching
+
+# fields of an auction stored in the full-text index
+INDEXED_FIELDS = {"item", "description", "category"}
 
 @receiver(post_migrate)
 def create_default_category(sender, **kwargs):
     
     # Create "Other" default category is does not exist in the database
     Category.objects.get_or_create(name="Other")
+
+    # Create the category of uncategorized auctions, and resolve its id again
+    Category.objects.get_or_create(name=Category.DEFAULT_NAME)
+    Category.clear_default()
+
+@receiver(post_delete, sender=Category)
+def forget_default_category(sender, instance, **kwargs):
+
+    # the cached default category id must not outlive the category, deletions are rare enough
+    # to resolve it again after any of them
+    Category.clear_default()
+
+    # its auctions were left without category, index them without the name
+    search.index_category(None)
+
+@receiver(post_save, sender=Category)
+def index_renamed_category(sender, instance, created, **kwargs):
+    if not created:
+        search.index_category(instance.id)
+
+@receiver(post_save, sender=Auction)
+def index_auction(sender, instance, update_fields=None, **kwargs):
+
+    # saves that only change the status or the bids leave the indexed text as is
+    if update_fields is None or INDEXED_FIELDS.intersection(update_fields):
+        search.index_auctions([instance.id])
+
+@receiver(post_delete, sender=Auction)
+def unindex_auction(sender, instance, **kwargs):
+    search.remove_auction(instance.id)
+
+    # an active auction no longer counts in its category
+    if instance.active:
+        Category.adjust_counts({instance.category_id: -1})
+
+@receiver(post_save, sender=Watchlist)
+@receiver(post_delete, sender=Watchlist)
+def forget_watched_auctions(sender, instance, **kwargs):
+
+    # the cached set of watched auctions of the user is out of date
+    watching.forget(instance.user_id)
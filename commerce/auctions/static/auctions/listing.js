@@ -0,0 +1,34 @@
+// ---------------------------------Live updates of a listing--------------------------------------------------
+
+// Listen to the bid and close events of the listing and update the page without reloading it
+document.addEventListener('DOMContentLoaded', () => {
+    const currentBid = document.getElementById('current-bid');
+    const status = document.getElementById('status');
+    const source = new EventSource(currentBid.dataset.events);
+
+    // Display the current price and number of bids
+    function showBid(data) {
+        if (data.bid_count > 0) {
+            const plural = data.bid_count > 1 ? 's' : '';
+            currentBid.innerHTML = `<strong>$${data.price} (${data.bid_count} bid${plural})</strong>`;
+        }
+    }
+
+    // Display the closed auction and stop listening
+    function showClosed(data) {
+        status.innerHTML = '<strong>Closed</strong>';
+        document.querySelectorAll('form[action$="/bid"] button, form[action$="/close"] button')
+            .forEach(button => button.disabled = true);
+        source.close();
+    }
+
+    source.addEventListener('state', event => {
+        const data = JSON.parse(event.data);
+        showBid(data);
+        if (!data.active) {
+            showClosed(data);
+        }
+    });
+    source.addEventListener('bid', event => showBid(JSON.parse(event.data)));
+    source.addEventListener('close', event => showClosed(JSON.parse(event.data)));
+});
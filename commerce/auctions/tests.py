@@ -1,3 +1,613 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, Auction, AuctionEvent, Bid, Category, Comment, Watchlist
+from . import bidding, closing, events, search
+from .management.commands import close_auctions
+from .pagination import encode_cursor, keyset_page
+
+
+class ListingTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.buyer = User.objects.create_user("buyer", "buyer@example.com", "password")
+        self.auction = Auction.objects.create(
+            seller=self.seller, item="Lamp", price=10, description="A lamp", winner=self.buyer
+        )
+        Watchlist.objects.create(user=self.buyer, auction=self.auction)
+        self.client.force_login(self.buyer)
+
+    def add_comments(self, count):
+        # every comment has its own writer, so lazily loading writers would show in the query count
+        first = User.objects.count()
+        writers = User.objects.bulk_create([
+            User(username=f"writer{first + i}") for i in range(count)
+        ])
+        Comment.objects.bulk_create([
+            Comment(writer=writer, auction=self.auction, text=f"Comment {i}")
+            for i, writer in enumerate(writers)
+        ])
+
+    def test_listing_query_count(self):
+        """The listing page costs the same number of queries whatever its number of comments."""
+        self.add_comments(5)
+
+        # the first visit caches the watched auctions of the user
+        self.client.get(reverse("listing", args=[self.auction.id]))
+
+        # session, user, auction with seller/winner, comments count, comments page
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("listing", args=[self.auction.id]))
+        self.assertEqual(response.status_code, 200)
+
+        self.add_comments(50)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("listing", args=[self.auction.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_listing_content(self):
+        """The listing page shows the watchlist status and the first page of comments."""
+        self.add_comments(25)
+        response = self.client.get(reverse("listing", args=[self.auction.id]))
+
+        self.assertTrue(response.context["watchlist_entry"])
+        self.assertEqual(len(response.context["comments"]), 20)
+        self.assertContains(response, "Remove from Watchlist")
+        self.assertContains(response, "Page 1 of 2")
+
+    def test_listing_not_watched(self):
+        Watchlist.objects.all().delete()
+        response = self.client.get(reverse("listing", args=[self.auction.id]))
+
+        self.assertFalse(response.context["watchlist_entry"])
+        self.assertContains(response, "Add to Watchlist")
+
+    def test_listing_watch_toggle(self):
+        """Adding and removing the auction from the watchlist shows on the next visit."""
+        url = reverse("listing", args=[self.auction.id])
+        self.client.get(url)
+
+        self.client.post(reverse("remove_watchlist", args=[self.auction.id]))
+        self.assertFalse(self.client.get(url).context["watchlist_entry"])
+
+        self.client.post(reverse("add_watchlist", args=[self.auction.id]))
+        self.assertTrue(self.client.get(url).context["watchlist_entry"])
+
+
+class ListingEventsTestCase(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.buyer = User.objects.create_user("buyer", "buyer@example.com", "password")
+        self.auction = Auction.objects.create(seller=self.seller, item="Lamp", price=10, description="A lamp")
+        self.client.force_login(self.buyer)
+
+    def test_bid_and_close_are_published(self):
+        """Bids and closings store the events relayed to the other processes."""
+        bidding.place_bid(self.auction.id, self.buyer, "12")
+        closing.settle([self.auction.id])
+
+        published = list(AuctionEvent.objects.order_by("id").values_list("kind", "data"))
+        self.assertEqual(published, [
+            ("bid", {"price": "12.00", "bid_count": 1, "bidder": "buyer"}),
+            ("close", {"price": "12.00", "winner": "buyer"}),
+        ])
+
+    def test_events_state(self):
+        """Without an event loop to stream from, the endpoint answers the current state."""
+        response = self.client.get(reverse("listing_events", args=[self.auction.id]))
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertContains(response, "event: state")
+        self.assertContains(response, '"price": "10.00"')
+        # nothing can be pushed to a WSGI request, so no relay thread is started for it
+        self.assertIsNone(events.relay._thread)
+
+
+    def test_old_events_are_pruned(self):
+        """Publishing removes the expired events, even when no stream listens."""
+        old = AuctionEvent.objects.create(auction=self.auction, kind="bid", data={}, origin="other")
+        AuctionEvent.objects.filter(id=old.id).update(created=timezone.now() - events.RETENTION * 2)
+        events._pruned = None
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bidding.place_bid(self.auction.id, self.buyer, "20")
+
+        self.assertFalse(AuctionEvent.objects.filter(id=old.id).exists())
+        self.assertTrue(AuctionEvent.objects.filter(auction=self.auction, kind="bid").exists())
+        self.assertIsNone(events.relay._thread)
+
+class BidTestCase(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.buyer = User.objects.create_user("buyer", "buyer@example.com", "password")
+        self.auction = Auction.objects.create(seller=self.seller, item="Lamp", price=10, description="A lamp")
+        self.client.force_login(self.buyer)
+
+    def test_amount_too_large(self):
+        """Amounts the price fields cannot store are refused, and the auction stays readable."""
+        self.client.post(reverse("bid", args=[self.auction.id]), {"bid_amount": "123456789012"})
+
+        self.auction.refresh_from_db()
+        self.assertIsNone(self.auction.proposed_price)
+        self.assertEqual(self.auction.bid_count, 0)
+        self.assertEqual(self.client.get(reverse("index")).status_code, 200)
+
+    def test_largest_amount(self):
+        bidding.place_bid(self.auction.id, self.buyer, "99999999.99")
+
+        self.auction.refresh_from_db()
+        self.assertEqual(str(self.auction.proposed_price), "99999999.99")
+
+
+    def test_invalid_amounts(self):
+        for value in ["abc", "NaN", "Infinity", "", "0", "-5", None]:
+            with self.assertRaises(bidding.InvalidAmount, msg=value):
+                bidding.parse_amount(value)
+
+    def test_amount_is_rounded_to_cents(self):
+        self.assertEqual(bidding.parse_amount(" 12.346 "), Decimal("12.35"))
+
+    def test_bids_must_rise(self):
+        """A bid below the initial price, or not above the current bid, is refused."""
+        with self.assertRaisesMessage(bidding.BidTooLow, "initial price"):
+            bidding.place_bid(self.auction.id, self.buyer, "9.99")
+        bidding.place_bid(self.auction.id, self.buyer, "10")
+
+        with self.assertRaisesMessage(bidding.BidTooLow, "current bid"):
+            bidding.place_bid(self.auction.id, self.buyer, "10")
+        with self.assertRaises(bidding.BidTooLow):
+            bidding.place_bid(self.auction.id, self.buyer, "9")
+        bidding.place_bid(self.auction.id, self.buyer, "10.01")
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.proposed_price, Decimal("10.01"))
+
+    def test_closed_auction(self):
+        self.auction.active = False
+        self.auction.save()
+
+        with self.assertRaises(bidding.AuctionClosed):
+            bidding.place_bid(self.auction.id, self.buyer, "20")
+        self.assertFalse(Bid.objects.exists())
+
+    def test_auction_past_end_time(self):
+        """An auction past its end time refuses bids before the scheduler closed it."""
+        Auction.objects.filter(id=self.auction.id).update(end_time=timezone.now() - timedelta(seconds=1))
+
+        with self.assertRaises(bidding.AuctionClosed):
+            bidding.place_bid(self.auction.id, self.buyer, "20")
+        self.assertFalse(Bid.objects.exists())
+
+    def test_missing_auction(self):
+        with self.assertRaises(bidding.AuctionNotFound):
+            bidding.place_bid(self.auction.id + 1, self.buyer, "20")
+
+    def test_bid_fields_follow_bids(self):
+        """bid_count, the winner and the price agree with the Bid rows, refused bids store nothing."""
+        other = User.objects.create_user("other", "other@example.com", "password")
+        for bidder, value in [(self.buyer, "11"), (other, "15"), (self.buyer, "14"), (self.buyer, "20")]:
+            try:
+                bidding.place_bid(self.auction.id, bidder, value)
+            except bidding.BidTooLow:
+                pass
+
+        self.auction.refresh_from_db()
+        bids = Bid.objects.filter(auction=self.auction)
+        highest = bids.order_by("-offer").first()
+        self.assertEqual(self.auction.bid_count, bids.count())
+        self.assertEqual(self.auction.bid_count, 3)
+        self.assertEqual(self.auction.winner, highest.bidder)
+        self.assertEqual(self.auction.proposed_price, highest.offer)
+
+    def test_bid_view_refusal(self):
+        response = self.client.post(reverse("bid", args=[self.auction.id]), {"bid_amount": "abc"}, follow=True)
+
+        self.assertContains(response, "Please enter a valid amount!")
+        self.assertFalse(Bid.objects.exists())
+
+class KeysetPageTestCase(TestCase):
+
+    def setUp(self):
+        seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.auctions = [
+            Auction.objects.create(seller=seller, item=f"Item {i}", price=10, description="An item")
+            for i in range(5)
+        ]
+        # the three middle auctions share their creation date, the id breaks the tie
+        tied = timezone.now()
+        Auction.objects.filter(id__in=[a.id for a in self.auctions[1:4]]).update(creation_date=tied)
+        Auction.objects.filter(id=self.auctions[0].id).update(creation_date=tied - timedelta(hours=1))
+        Auction.objects.filter(id=self.auctions[4].id).update(creation_date=tied + timedelta(hours=1))
+        for auction in self.auctions:
+            auction.refresh_from_db()
+
+        # the feed order: newest first, the highest id first among ties
+        self.feed = [self.auctions[i] for i in (4, 3, 2, 1, 0)]
+
+    def test_first_page(self):
+        page = keyset_page(Auction.objects.all(), size=2)
+
+        self.assertEqual(list(page), self.feed[:2])
+        self.assertEqual(page.next, encode_cursor(self.feed[1]))
+        self.assertIsNone(page.previous)
+
+    def test_after_ties(self):
+        """Pages starting inside a run of equal creation dates neither skip nor repeat auctions."""
+        seen = []
+        page = keyset_page(Auction.objects.all(), size=2)
+        while True:
+            seen.extend(page)
+            if page.next is None:
+                break
+            page = keyset_page(Auction.objects.all(), after=page.next, size=2)
+
+        self.assertEqual(seen, self.feed)
+        self.assertEqual(list(page), self.feed[4:])
+        self.assertEqual(page.previous, encode_cursor(self.feed[4]))
+
+    def test_before_ties(self):
+        """A page before a cursor ends right before it, in feed order."""
+        page = keyset_page(Auction.objects.all(), before=encode_cursor(self.feed[3]), size=2)
+
+        self.assertEqual(list(page), self.feed[1:3])
+        self.assertEqual(page.next, encode_cursor(self.feed[2]))
+        self.assertEqual(page.previous, encode_cursor(self.feed[1]))
+
+    def test_before_first_page(self):
+        """The page before the second one is the first one, with no previous page."""
+        page = keyset_page(Auction.objects.all(), before=encode_cursor(self.feed[2]), size=2)
+
+        self.assertEqual(list(page), self.feed[:2])
+        self.assertIsNone(page.previous)
+
+    def test_malformed_cursor(self):
+        """A malformed cursor reads the first page."""
+        page = keyset_page(Auction.objects.all(), after="not-a-cursor", size=2)
+
+        self.assertEqual(list(page), self.feed[:2])
+        self.assertIsNone(page.previous)
+
+
+class ActiveCountTestCase(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.books = Category.objects.create(name="Books")
+        self.games = Category.objects.create(name="Games")
+
+    def create(self, **kwargs):
+        return Auction.objects.create(seller=self.seller, item="Item", price=10, description="An item", **kwargs)
+
+    def assertCounts(self, books, games):
+        self.assertEqual(Category.objects.get(id=self.books.id).active_count, books)
+        self.assertEqual(Category.objects.get(id=self.games.id).active_count, games)
+
+    def test_create(self):
+        self.create(category=self.books)
+        self.create(category=self.books)
+        self.create(category=self.games, active=False)
+
+        self.assertCounts(2, 0)
+
+    def test_default_category(self):
+        """Auctions created without a category count in the default one."""
+        self.create()
+
+        self.assertEqual(Category.objects.get(id=Category.default_id()).active_count, 1)
+
+    def test_close_and_reopen(self):
+        auction = self.create(category=self.books)
+        auction.active = False
+        auction.save()
+        self.assertCounts(0, 0)
+
+        auction.active = True
+        auction.save(update_fields=["active"])
+        self.assertCounts(1, 0)
+
+    def test_change_category(self):
+        auction = self.create(category=self.books)
+        auction.category = self.games
+        auction.save()
+
+        self.assertCounts(0, 1)
+
+    def test_update_fields(self):
+        """Fields left out of update_fields keep counting with their stored value."""
+        auction = self.create(category=self.books)
+        auction.category = self.games
+        auction.active = False
+        auction.save(update_fields=["active"])
+        self.assertCounts(0, 0)
+
+        auction.save(update_fields=["category"])
+        self.assertCounts(0, 0)
+
+        auction.item = "Renamed"
+        auction.active = True
+        auction.save(update_fields=["item"])
+        self.assertCounts(0, 0)
+
+    def test_save_twice(self):
+        """Saving an unchanged auction counts it once."""
+        auction = self.create(category=self.books)
+        auction.save()
+        auction.save()
+
+        self.assertCounts(1, 0)
+
+    def test_bulk_create(self):
+        Auction.objects.bulk_create([
+            Auction(seller=self.seller, item="Item", price=10, description="An item", category=category, active=active)
+            for category, active in [(self.books, True), (self.books, True), (self.games, True), (self.games, False)]
+        ])
+
+        self.assertCounts(2, 1)
+
+    def test_delete(self):
+        active = self.create(category=self.books)
+        closed = self.create(category=self.books, active=False)
+        self.create(category=self.books)
+
+        active.delete()
+        closed.delete()
+        self.assertCounts(1, 0)
+
+    def test_cached_categories_follow_counts(self):
+        """The cached categories are dropped when a counter changes."""
+        cache.clear()
+        Category.cached()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(category=self.books)
+
+        counts = {category.id: category.active_count for category in Category.cached()}
+        self.assertEqual(counts[self.books.id], 1)
+
+
+
+    def test_deleted_default_category(self):
+        """Once the default category is deleted, no process keeps giving its id to auctions."""
+        self.addCleanup(cache.delete, Category.DEFAULT_CACHE_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            default_id = Category.default_id()
+        self.assertEqual(cache.get(Category.DEFAULT_CACHE_KEY), default_id)
+
+        Category.objects.filter(id=default_id).delete()
+        self.assertIsNone(cache.get(Category.DEFAULT_CACHE_KEY))
+        auction = self.create()
+
+        self.assertNotEqual(auction.category_id, default_id)
+        self.assertEqual(auction.category.name, Category.DEFAULT_NAME)
+
+    def test_default_category_query_count(self):
+        """Saving auctions without a category does not look the default category up."""
+        self.addCleanup(cache.delete, Category.DEFAULT_CACHE_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.default_id()
+        with self.assertNumQueries(0):
+            Category.default_id()
+
+    def test_rolled_back_default_category(self):
+        """The id of a default category created by a rolled back transaction is not cached."""
+        Category.objects.filter(name=Category.DEFAULT_NAME).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Category.default_id()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+
+        self.assertIsNone(cache.get(Category.DEFAULT_CACHE_KEY))
+
+class ClosingTestCase(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.buyer = User.objects.create_user("buyer", "buyer@example.com", "password")
+        self.other = User.objects.create_user("other", "other@example.com", "password")
+        self.category = Category.objects.create(name="Books")
+        self.past = timezone.now() - timedelta(minutes=1)
+
+    def create(self, count=1, end_time=None):
+        auctions = [
+            Auction.objects.create(seller=self.seller, item="Item", price=10, description="An item",
+                                   category=self.category)
+            for _ in range(count)
+        ]
+        # bids are refused after the end time, it is set once the bids are placed
+        Auction.objects.filter(id__in=[a.id for a in auctions]).update(end_time=end_time)
+        return auctions
+
+    def end(self, auction):
+        Auction.objects.filter(id=auction.id).update(end_time=self.past)
+
+    def test_close_due_settles_winner(self):
+        """The highest bid wins, the earliest one on a tie."""
+        auction, = self.create()
+        auction.record_bid(self.buyer, 20)
+        auction.record_bid(self.other, 30)
+        Bid.objects.create(bidder=self.buyer, auction=auction, offer=30)
+        self.end(auction)
+
+        self.assertEqual(closing.close_due(), 1)
+        auction.refresh_from_db()
+        self.assertFalse(auction.active)
+        self.assertEqual(auction.winner, self.other)
+        self.assertEqual(auction.proposed_price, 30)
+        self.assertEqual(Category.objects.get(id=self.category.id).active_count, 0)
+        self.assertEqual(AuctionEvent.objects.get(auction=auction, kind="close").data,
+                         {"price": "30.00", "winner": "other"})
+
+    def test_close_without_bids(self):
+        auction, = self.create(end_time=self.past)
+
+        self.assertEqual(closing.close_due(), 1)
+        auction.refresh_from_db()
+        self.assertFalse(auction.active)
+        self.assertIsNone(auction.winner)
+        self.assertEqual(AuctionEvent.objects.get(auction=auction, kind="close").data,
+                         {"price": "10.00", "winner": None})
+
+    def test_close_due_batches(self):
+        """Each call closes at most `limit` auctions, the oldest end times first."""
+        due = self.create(3, end_time=self.past)
+        Auction.objects.filter(id=due[2].id).update(end_time=self.past - timedelta(minutes=1))
+        later, = self.create(end_time=timezone.now() + timedelta(hours=1))
+        never, = self.create()
+
+        self.assertEqual(closing.close_due(limit=2), 2)
+        self.assertEqual(set(Auction.objects.by_status(False).values_list("id", flat=True)),
+                         {due[2].id, due[0].id})
+        self.assertEqual(closing.close_due(limit=2), 1)
+        self.assertEqual(closing.close_due(limit=2), 0)
+
+        self.assertEqual(set(Auction.objects.by_status(True).values_list("id", flat=True)),
+                         {later.id, never.id})
+        self.assertEqual(Category.objects.get(id=self.category.id).active_count, 2)
+        self.assertEqual(closing.next_end_time(), Auction.objects.get(id=later.id).end_time)
+
+    def test_settle_leaves_closed_auctions(self):
+        """Auctions already closed keep their winner and are not counted again."""
+        open_auction, closed_auction = self.create(2)
+        closed_auction.record_bid(self.buyer, 20)
+        closed_auction.active = False
+        closed_auction.save()
+        open_auction.record_bid(self.other, 15)
+
+        self.assertEqual(closing.settle([open_auction.id, closed_auction.id]), 1)
+        open_auction.refresh_from_db()
+        closed_auction.refresh_from_db()
+        self.assertEqual(open_auction.winner, self.other)
+        self.assertEqual(closed_auction.winner, self.buyer)
+        self.assertEqual(Category.objects.get(id=self.category.id).active_count, 0)
+
+    def test_wait_after_due_auctions(self):
+        """The scheduler still pauses when an auction it could not close is past its end time."""
+        self.create(end_time=self.past)
+        command = close_auctions.Command()
+        command.running = True
+
+        start = time.monotonic()
+        command.wait(5)
+        self.assertGreaterEqual(time.monotonic() - start, close_auctions.MIN_WAIT)
+
+
+class SearchTestCase(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.lighting = Category.objects.create(name="Lighting")
+
+    def create(self, item, description="An item", **kwargs):
+        return Auction.objects.create(seller=self.seller, item=item, price=10, description=description, **kwargs)
+
+    def titles(self, query):
+        return [auction.item for auction in search.search(query)[:10]]
+
+    def test_ranking(self):
+        """A match in the item counts most, then in the category, then in the description."""
+        self.create("Old desk", "Comes with a lamp")
+        self.create("Chair", category=self.lighting)
+        self.create("Brass lamp")
+
+        self.assertEqual(self.titles("lamp"), ["Brass lamp", "Old desk"])
+        self.create("Lighting rod")
+        self.create("Stool", "Lighting not included")
+        self.assertEqual(self.titles("lighting"), ["Lighting rod", "Chair", "Stool"])
+
+    def test_every_word_and_prefix(self):
+        self.create("Brass lamp")
+        self.create("Brass bed")
+
+        self.assertEqual(self.titles("brass la"), ["Brass lamp"])
+        self.assertEqual(self.titles("lamp brass"), ["Brass lamp"])
+
+    def test_query_syntax_is_ignored(self):
+        """Quotes and operators typed by the user are searched as words."""
+        self.create("Brass lamp")
+
+        self.assertEqual(self.titles('lamp" OR "bed'), [])
+        self.assertEqual(self.titles('"lamp'), ["Brass lamp"])
+        self.assertEqual(self.titles("***"), [])
+
+    def test_closed_auctions_are_not_found(self):
+        auction = self.create("Brass lamp")
+        auction.active = False
+        auction.save(update_fields=["active"])
+
+        self.assertEqual(self.titles("lamp"), [])
+
+    def test_renamed_and_deleted_auction(self):
+        auction = self.create("Brass lamp")
+        auction.item = "Brass bed"
+        auction.save()
+        self.assertEqual(self.titles("lamp"), [])
+        self.assertEqual(self.titles("bed"), ["Brass bed"])
+
+        auction.delete()
+        self.assertEqual(self.titles("bed"), [])
+
+    def test_renamed_and_deleted_category(self):
+        self.create("Chair", category=self.lighting)
+        self.lighting.name = "Furniture"
+        self.lighting.save()
+        self.assertEqual(self.titles("lighting"), [])
+        self.assertEqual(self.titles("furniture"), ["Chair"])
+
+        self.lighting.delete()
+        self.assertEqual(self.titles("furniture"), [])
+        self.assertEqual(self.titles("chair"), ["Chair"])
+
+    def test_bulk_create_is_indexed(self):
+        Auction.objects.bulk_create([
+            Auction(seller=self.seller, item=f"Lamp {i}", price=10, description="An item") for i in range(3)
+        ])
+
+        self.assertEqual(len(self.titles("lamp")), 3)
+
+    def test_pages(self):
+        """The Paginator counts the matches and only fetches the slice of a page."""
+        for i in range(3):
+            self.create(f"Lamp {i}")
+        for i in range(2):
+            self.create(f"Desk {i}", "Comes with a lamp")
+        self.create("Stool")
+
+        paginator = Paginator(search.search("lamp"), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+        pages = [[auction.item for auction in paginator.page(number)] for number in (1, 2, 3)]
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        # the auctions matching in their item come first, the most recent first among equals
+        self.assertEqual(sum(pages, []), ["Lamp 2", "Lamp 1", "Lamp 0", "Desk 1", "Desk 0"])
+
+    def test_like_fallback(self):
+        """Without the full-text index, the item, description and category are scanned."""
+        self.create("Brass lamp")
+        self.create("Old desk", "Comes with a lamp")
+        self.create("Chair", category=self.lighting)
+        self.create("Stool")
+
+        with mock.patch.object(search, "is_available", return_value=False):
+            self.assertEqual(self.titles("lamp"), ["Old desk", "Brass lamp"])
+            self.assertEqual(self.titles("light"), ["Chair"])
+
+    def test_search_view(self):
+        self.create("Brass lamp")
 
-# Create your tests here.
+        response = self.client.get(reverse("search"), {"q": "lamp"})
+        self.assertEqual([auction.item for auction in response.context["auctions"]], ["Brass lamp"])
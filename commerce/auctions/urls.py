@@ -15,6 +15,7 @@ urlpatterns = [
     path("listing/<int:id>/watch", views.add_watchlist, name="add_watchlist"),
     path("listing/<int:id>/remwatch", views.remove_watchlist, name="remove_watchlist"),
     path("listing/<int:id>/bid", views.bid, name="bid"),
+    path("listing/<int:id>/events", views.listing_events, name="listing_events"),
     path("categories", views.categories, name="categories"),
     path("categories/<str:category>/", views.auctions_by_category, name="auctions_categorized"),
     path("closed", views.closed, name="closed"),
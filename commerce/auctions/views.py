@@ -1,27 +1,44 @@
+import asyncio
+
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.db import IntegrityError
-from django.db.models import Count, Q
-from django.http import HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse
 
-from .models import User, Auction, Comment, Watchlist, Bid, Category
+from .models import User, Auction, Comment, Category
 from .forms import AuctionForm
+from .pagination import AUCTIONS_PER_PAGE, keyset_page
+from .search import search as search_auctions
+from . import bidding, closing, events, watching
+
+# number of comments displayed on each page of a listing
+COMMENTS_PER_PAGE = 20
+
+# seconds between the comments keeping an idle event stream open through proxies, and
+# milliseconds browsers wait before reconnecting when the server cannot stream
+EVENTS_KEEPALIVE = 15
+EVENTS_RETRY = 5000
 
+def page_of(request, auctions):
+    # read the page of the feed pointed by the after/before cursors of the url
+    return keyset_page(auctions, after=request.GET.get("after"), before=request.GET.get("before"))
 
 def index(request):
 
-    auctions = Auction.objects.filter(active=True)
+    auctions = page_of(request, Auction.objects.by_status(True))
     return render(request, "auctions/index.html", {
         "auctions": auctions
     })
 
 def closed(request):
 
-    # fetch all closed auctions
-    auctions = Auction.objects.filter(active=False)
+    # fetch a page of closed auctions
+    auctions = page_of(request, Auction.objects.by_status(False))
     return render(request, "auctions/closed.html", {
         "auctions": auctions
     })
@@ -116,11 +133,9 @@ def create_listing(request):
 @login_required
 def listing(request, id):  
     
-    # Fetch the listing of the correct id and all the related comments.
+    # Fetch the listing of the correct id with its seller and winner.
     try:
-        listing = Auction.objects.get(id=id)
-        comments = listing.comments.all()
-        watchlist_entry = Watchlist.objects.filter(user=request.user, auction=listing).first()
+        listing = Auction.objects.with_details().get(id=id)
     except Auction.DoesNotExist:
         return HttpResponseRedirect(reverse("error"))
     
@@ -141,14 +156,64 @@ def listing(request, id):
         # generate an error message if the text input is posted empty
         else:
             messages.error(request, "You cannot submit an empty comment!")
+
+    # paginate the comments, fetching their writer with them
+    paginator = Paginator(listing.comments.select_related("writer"), COMMENTS_PER_PAGE)
+    comments = paginator.get_page(request.GET.get("page"))
     
     return render(request, "auctions/listing.html", {
         "listing": listing,
         "comments": comments,
         "id": id,
-        "watchlist_entry": watchlist_entry 
+        "watchlist_entry": watching.is_watched(request.user, listing.id)
     })
     
+async def listing_events(request, id):
+
+    # stream of the bid and close events of a listing, as Server-Sent Events
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+
+    auction = await Auction.objects.select_related("winner").filter(id=id).afirst()
+    if auction is None:
+        raise Http404
+
+    # a WSGI worker cannot wait for events, and a closed auction has none left: send the state
+    # and let the browser ask again later, without subscribing (which starts the relay thread)
+    if not isinstance(request, ASGIRequest) or not auction.active:
+        state = events.format_event(events.state(auction))
+        return HttpResponse(f"retry: {EVENTS_RETRY}\n{state}", content_type="text/event-stream")
+
+    # subscribe, then read the state again so no event falls in between
+    queue = events.hub.subscribe(id)
+    auction = await Auction.objects.select_related("winner").filter(id=id).afirst()
+    if auction is None or not auction.active:
+        # deleted or closed in the meantime
+        events.hub.unsubscribe(id, queue)
+        return await listing_events(request, id)
+    state = events.format_event(events.state(auction))
+
+    async def stream():
+        try:
+            yield state
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield events.format_event(event)
+                if event["kind"] == "close":
+                    break
+        finally:
+            events.hub.unsubscribe(id, queue)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 @login_required
 def close_auction(request, id):
     try:
@@ -163,8 +228,8 @@ def close_auction(request, id):
         elif request.user != auction.seller: 
             messages.error(request, "You do not own the auction!")
         else: 
-            auction.active = False
-            auction.save()
+            # close the auction and give it to the highest bidder
+            closing.settle([auction.id])
             messages.success(request, "The bid has been closed.")
     
     return HttpResponseRedirect(reverse("listing", args=[id]))
@@ -179,14 +244,12 @@ def add_watchlist(request, id):
     
     if request.method == "POST":
         
-        # check if the watchlist already created, create it if not
-        watchlist, created = Watchlist.objects.get_or_create(user=request.user, auction=auction)
+        # closed auctions cannot be watched, the others are added unless already watched
         if not auction.active:
             messages.error(request, "This auction is closed and cannot be added to your watch list!")
-        elif not created:
-            print(created)
+        elif not watching.watch(request.user, auction):
             messages.error(request, "This auction is already in your watch list!")
-        elif created:
+        else:
             messages.success(request, "This auction was added to your watchlist")
             
     return HttpResponseRedirect(reverse("listing", args=[id]))
@@ -201,51 +264,28 @@ def remove_watchlist(request, id):
     
     if request.method == "POST":
         
-        # check if the watchlist already created, create it if not
-        entry = Watchlist.objects.filter(user=request.user, auction=auction).first()
-        if not entry:
+        # remove the auction from the watchlist if it is in it
+        if not watching.unwatch(request.user, auction):
             messages.error(request, "This auction is not in your watchlist")
         else:
-            entry.delete()
             messages.info(request, "The auction was removed from your watchlist.")
 
     return HttpResponseRedirect(reverse("listing", args=[id]))
 
 @login_required
 def bid(request, id):
-    try:
-        auction = Auction.objects.get(id=id)
-    except Auction.DoesNotExist:
-        messages.error(request, "The auction you tried to bid on does not exist!")
-        return HttpResponseRedirect(reverse("index"))
-    
     if request.method == "POST":
 
-        # ensure 2 decimal numbers
-        amount = round(float(request.POST.get("bid_amount")), 2)
-        print(amount)
-        
-        if amount < auction.price:
-            messages.error(request, "The amount you want to bid should be higher than the initial price!")
+        # place the bid, the amount is checked against the current price when the auction is updated
+        try:
+            bidding.place_bid(id, request.user, request.POST.get("bid_amount"))
+        except bidding.AuctionNotFound as error:
+            messages.error(request, str(error))
+            return HttpResponseRedirect(reverse("index"))
+        except bidding.BidError as error:
+            messages.error(request, str(error))
             return HttpResponseRedirect(reverse("listing", args=[id]))
-        
-        elif auction.proposed_price:
-            if amount < auction.proposed_price:
-                messages.error(request, "The amount you want to bid should be higher than the current bid!")
-                return HttpResponseRedirect(reverse("listing", args=[id]))
-        
-        
-        # update the value of the auction and update the potential winner of the auction
-        auction.proposed_price = amount
-        auction.winner = request.user
-        auction.save()
-        
-        # create the bid history to keep track of who bid on which auction
-        Bid.objects.create(
-        bidder=request.user,
-        auction=auction,
-        offer=amount
-        )
+
         messages.success(request, "Your bid was placed on the auction")
         return HttpResponseRedirect(reverse("listing", args=[id]))
     
@@ -255,10 +295,8 @@ def bid(request, id):
 # display the categories
 def categories(request):
 
-    # annotate the categories to get the count of active auctions
-    categories = Category.objects.annotate(
-        auction_count=Count('sorted_auctions', filter=Q(sorted_auctions__active=True))
-        )
+    # the count of active auctions is maintained on each category, and the list is cached
+    categories = Category.cached()
     
     return render(request, 'auctions/categories.html', {
         "categories": categories,
@@ -266,9 +304,11 @@ def categories(request):
 
 # display the auctions by categories
 def auctions_by_category(request, category):
-    auctions = Auction.objects.filter(category__name__iexact=category, active=True)
+    # resolve the category first so the auctions are read from the (category, active, creation_date) index
+    category_id = Category.objects.filter(name__iexact=category).values_list("id", flat=True).first()
+    auctions = page_of(request, Auction.objects.by_status(True).filter(category_id=category_id))
 
-    if not auctions:
+    if category_id is None or not auctions:
         messages.info(request, "No auctions found in the selected category")
         return HttpResponseRedirect(reverse('categories'))
 
@@ -282,9 +322,11 @@ def search(request):
     query = request.GET.get('q')
 
     if query:
-        auctions = Auction.objects.filter(item__icontains=query, active=True)
+        # rank the matching auctions with the full-text index and show a page of them
+        paginator = Paginator(search_auctions(query), AUCTIONS_PER_PAGE)
+        auctions = paginator.get_page(request.GET.get("page"))
 
-        if not auctions:
+        if not paginator.count:
             messages.info(request, f"No auctions containing the keyword '{query}' was found")
 
         return render(request, 'auctions/search.html', {
@@ -298,16 +340,15 @@ def search(request):
 @login_required
 def watchlist(request):
 
-    # get the auctions of the corresponding watchlist.
-    items = Watchlist.objects.filter(user=request.user)
-    auctions = [item.auction for item in items]
+    # get a page of the auctions of the corresponding watchlist.
+    auctions = watching.watched_page(request.user, request.GET.get("page"))
     return render(request, "auctions/watchlist.html", {
         "auctions": auctions
     })
 
 @login_required
 def myauctions(request):
-    auctions = Auction.objects.filter(seller=request.user)
+    auctions = page_of(request, Auction.objects.filter(seller=request.user))
     return render(request, "auctions/myauctions.html", {
         "auctions": auctions
     })
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from .models import Auction, Watchlist
+
+
+# number of auctions displayed on each page of the watchlist
+WATCHLIST_PER_PAGE = 30
+
+# the set of auction ids a user watches stays cached this many seconds, unless the
+# watchlist changes before, the cache must be shared by the worker processes (see CACHES)
+WATCHED_TTL = 300
+
+
+def _cache_key(user_id):
+    return f"auctions:watched:{user_id}"
+
+
+def watched_ids(user):
+    """Return the set of the ids of the auctions in a user's watchlist.
+
+    The set is cached per user, so pages that only need to know whether an auction is watched do
+    not query the watchlist.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = _cache_key(user.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Watchlist.objects.filter(user_id=user.id).values_list("auction_id", flat=True))
+        cache.set(key, ids, WATCHED_TTL)
+    return ids
+
+
+def is_watched(user, auction_id):
+    """Return True if the auction is in the user's watchlist."""
+    return auction_id in watched_ids(user)
+
+
+def forget(user_id):
+    """Drop the cached watchlist of a user, now and once the current transaction commits.
+
+    Dropping it again after the commit discards a set cached from the old rows meanwhile.
+    """
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def watch(user, auction):
+    """Add an auction to a user's watchlist.
+
+    Returns:
+        Bool: False if the auction was already in the watchlist.
+    """
+    watchlist, created = Watchlist.objects.get_or_create(user=user, auction=auction)
+    return created
+
+
+def unwatch(user, auction):
+    """Remove an auction from a user's watchlist.
+
+    Returns:
+        Bool: False if the auction was not in the watchlist.
+    """
+    deleted, _ = Watchlist.objects.filter(user=user, auction=auction).delete()
+    return bool(deleted)
+
+
+def watched_page(user, number):
+    """Return a page of the auctions a user watches, the last watched first.
+
+    The auctions are read by joining the watchlist in a single query, instead of loading each
+    watchlist row and then its auction.
+    """
+    auctions = Auction.objects.filter(watchlist__user=user).order_by("-watchlist__id")
+    return Paginator(auctions, WATCHLIST_PER_PAGE).get_page(number)
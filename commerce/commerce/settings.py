@@ -81,6 +81,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# The watched auctions of each user and the category counts are cached and dropped when they
+# change, so every worker process must see the same cache. The file based cache is shared by the
+# processes of one host, use Memcached or Redis when workers run on several hosts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
 AUTH_USER_MODEL = 'auctions.User'
 
 # Password validation
@@ -1,3 +1,7 @@
 from django.contrib import admin
 
+from .models import Entry, Revision
+
 # Register your models here.
+admin.site.register(Entry)
+admin.site.register(Revision)
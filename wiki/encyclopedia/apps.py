@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EncyclopediaConfig(AppConfig):
     name = 'encyclopedia'
+
+    def ready(self):
+        import encyclopedia.signals
@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+
+
+FORMATS = ["tar", "zip", "jsonl"]
+
+
+def guess_format(path):
+    """
+    Returns the archive format matching a file name, or None.
+    """
+    name = path.lower()
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+        return "tar"
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def _title(name):
+    # archive members are "<title>.md", possibly inside a directory
+    name = os.path.basename(name)
+    return name[:-3] if name.endswith(".md") else None
+
+
+def read_archive(stream, format):
+    """
+    Yields the (title, content) pairs stored in an archive, one at a
+    time. `stream` is a binary file, seekable for zip archives.
+    """
+    if format == "tar":
+        with tarfile.open(fileobj=stream, mode="r|*") as archive:
+            for member in archive:
+                title = _title(member.name)
+                if member.isfile() and title:
+                    yield title, archive.extractfile(member).read().decode("utf-8")
+    elif format == "zip":
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                title = _title(info.filename)
+                if not info.is_dir() and title:
+                    yield title, archive.read(info).decode("utf-8")
+    elif format == "jsonl":
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["title"], entry["content"]
+    else:
+        raise ValueError(f"Unknown archive format '{format}'")
+
+
+def write_archive(stream, format, entries, compress=False):
+    """
+    Writes (title, content) pairs to a binary stream as they come, the
+    stream does not need to be seekable.
+    """
+    if format == "tar":
+        with tarfile.open(fileobj=stream, mode="w|gz" if compress else "w|") as archive:
+            for title, content in entries:
+                data = content.encode("utf-8")
+                info = tarfile.TarInfo(f"{title}.md")
+                info.size = len(data)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(data))
+    elif format == "zip":
+        method = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(stream, "w", compression=method) as archive:
+            for title, content in entries:
+                archive.writestr(f"{title}.md", content)
+    elif format == "jsonl":
+        for title, content in entries:
+            line = json.dumps({"title": title, "content": content}, ensure_ascii=False)
+            stream.write(f"{line}\n".encode("utf-8"))
+    else:
+        raise ValueError(f"Unknown archive format '{format}'")
@@ -0,0 +1,76 @@
+import re
+from urllib.parse import unquote
+
+from django.db import transaction
+
+from .models import Link
+
+
+# [text](/wiki/Title) and [text](/wiki/Title "tooltip")
+LINK_RE = re.compile(r"\]\(\s*/wiki/([^)\s]+)")
+
+# set once this process built the graph, which may have no links at all
+_built = False
+
+
+def extract_links(content):
+    """
+    Returns the set of entry titles a Markdown content links to.
+    """
+    return {unquote(target) for target in LINK_RE.findall(content)}
+
+
+def update_links(title, content):
+    """
+    Replaces the outgoing links of an entry.
+    """
+    with transaction.atomic():
+        Link.objects.filter(source=title).delete()
+        Link.objects.bulk_create([
+            Link(source=title, target=target, target_key=target.lower())
+            for target in extract_links(content)
+        ])
+
+
+def is_built():
+    """
+    Returns True once the link graph has been built.
+    """
+    return _built or Link.objects.exists()
+
+
+def rebuild(entries):
+    """
+    Rebuilds the whole link graph from an iterable of (title, content) pairs.
+    """
+    global _built
+    with transaction.atomic():
+        Link.objects.all().delete()
+        for title, content in entries:
+            Link.objects.bulk_create([
+                Link(source=title, target=target, target_key=target.lower())
+                for target in extract_links(content)
+            ])
+    _built = True
+
+
+def backlinks(title):
+    """
+    Returns the sorted titles of the entries linking to `title`.
+    """
+    return list(Link.objects.filter(target_key=title.lower())
+                .order_by("source").values_list("source", flat=True).distinct())
+
+
+def linked_keys():
+    """
+    Returns the lowercase titles that at least one entry links to.
+    """
+    return set(Link.objects.values_list("target_key", flat=True).distinct())
+
+
+def links():
+    """
+    Returns every (source, target) link.
+    """
+    return Link.objects.order_by("source", "target").values_list("source", "target")
@@ -0,0 +1,169 @@
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from encyclopedia import links, search, storage, util
+from encyclopedia.render import render_cache
+
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est"
+).split()
+
+VIEWS = ["index", "entry", "search", "random_page", "new_page"]
+
+
+def generate_corpus(directory, count, words, rng):
+    """
+    Writes `count` synthetic entries of about `words` words each, with
+    a few links between them, and returns their titles.
+    """
+    os.makedirs(directory, exist_ok=True)
+    titles = [f"{rng.choice(WORDS).title()} {number}" for number in range(count)]
+    for title in titles:
+        body = []
+        for _ in range(words):
+            if rng.random() < 0.01:
+                target = rng.choice(titles)
+                body.append(f"[{target}](/wiki/{target.replace(' ', '%20')})")
+            else:
+                body.append(rng.choice(WORDS))
+        with open(os.path.join(directory, f"{title}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# {title}\n\n" + " ".join(body) + "\n")
+    return titles
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def reset_state():
+    # forget everything the module-level indexes learned about another corpus
+    storage._backend = None
+    util.entry_index.clear()
+    util.title_index.rebuild([], None)
+    render_cache.clear()
+    links._built = False
+    search._invalidate_stats()
+
+
+class Command(BaseCommand):
+    help = ("Benchmarks the encyclopedia views on synthetic corpora and prints "
+            "latency percentiles, throughput and peak RSS as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                            help="Number of entries of each generated corpus.")
+        parser.add_argument("--words", type=int, default=300,
+                            help="Approximate number of words per entry.")
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Requests sent to each view.")
+        parser.add_argument("--views", nargs="+", choices=VIEWS, default=VIEWS)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="File receiving the JSON report.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        setup_test_environment()
+        old_database = connection.creation.create_test_db(verbosity=0)
+        root = tempfile.mkdtemp(prefix="wiki-benchmark-")
+        cache_directory = render_cache.directory
+        report = []
+        try:
+            for size in options["sizes"]:
+                report.append(self.run_corpus(root, size, rng, options))
+        finally:
+            render_cache.directory = cache_directory
+            reset_state()
+            connection.creation.destroy_test_db(old_database, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(root)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_corpus(self, root, size, rng, options):
+        media_root = os.path.join(root, str(size))
+        cache_root = os.path.join(media_root, "cache")
+
+        started = time.perf_counter()
+        titles = generate_corpus(os.path.join(media_root, "entries"), size, options["words"], rng)
+        generated = time.perf_counter() - started
+
+        with override_settings(
+            MEDIA_ROOT=media_root,
+            WIKI_CACHE_DIR=cache_root,
+            WIKI_STORAGE_BACKEND="encyclopedia.storage.FileSystemBackend",
+            WIKI_PRERENDER_ON_SAVE=False,
+        ):
+            reset_state()
+            render_cache.directory = os.path.join(cache_root, "rendered")
+
+            started = time.perf_counter()
+            util.rebuild_indexes()
+            indexed = time.perf_counter() - started
+
+            client = Client()
+            results = {}
+            for view in options["views"]:
+                results[view] = self.measure(client, view, titles, rng, options["requests"])
+
+        self.stderr.write(f"{size} entries done")
+        return {
+            "entries": size,
+            "words_per_entry": options["words"],
+            "generate_seconds": round(generated, 3),
+            "index_seconds": round(indexed, 3),
+            "views": results,
+            # ru_maxrss is in KiB on Linux and never goes down within a process
+            "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def measure(self, client, view, titles, rng, count):
+        latencies = []
+        for number in range(count):
+            if view == "index":
+                request = lambda: client.get("/")
+            elif view == "entry":
+                title = rng.choice(titles)
+                request = lambda: client.get(f"/wiki/{title}")
+            elif view == "search":
+                query = " ".join(rng.sample(WORDS, 2))
+                request = lambda: client.get("/search", {"q": query})
+            elif view == "random_page":
+                request = lambda: client.get("/random")
+            else:
+                data = {"title": f"Benchmark {number} {rng.random()}", "content": "# New page"}
+                request = lambda: client.post("/new_page", data)
+
+            started = time.perf_counter()
+            response = request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{view} answered {response.status_code}")
+
+        total = sum(latencies)
+        return {
+            "requests": count,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "throughput_rps": round(count / total, 1) if total else None,
+        }
@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from encyclopedia import util
+from encyclopedia.archive import FORMATS, guess_format, write_archive
+
+
+class Command(BaseCommand):
+    help = "Exports every entry to a tar, zip or JSONL archive ('-' writes to stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Path of the archive, or - for stdout.")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Archive format, guessed from the file name by default.")
+        parser.add_argument("--compress", action="store_true",
+                            help="Compress tar (gzip) and zip (deflate) archives.")
+
+    def handle(self, *args, **options):
+        path = options["archive"]
+        format = options["format"] or guess_format(path)
+        if format is None:
+            raise CommandError("Cannot guess the archive format, use --format.")
+        compress = options["compress"] or path.endswith((".tar.gz", ".tgz"))
+
+        # read the entries one at a time while the archive is written
+        titles = util.list_entries()
+        entries = ((title, util.get_entry(title)) for title in titles)
+
+        stream = sys.stdout.buffer if path == "-" else open(path, "wb")
+        try:
+            write_archive(stream, format, entries, compress=compress)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+        self.stderr.write(self.style.SUCCESS(f"Exported {len(titles)} entries."))
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from encyclopedia import util
+from encyclopedia.archive import FORMATS, guess_format, read_archive
+
+
+class Command(BaseCommand):
+    help = "Imports entries from a tar, zip or JSONL archive ('-' reads from stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Path of the archive, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Archive format, guessed from the file name by default.")
+        parser.add_argument("--workers", type=int, default=8,
+                            help="Number of entries written in parallel.")
+        parser.add_argument("--skip-existing", action="store_true",
+                            help="Keep existing entries instead of replacing them.")
+
+    def handle(self, *args, **options):
+        path = options["archive"]
+        format = options["format"] or guess_format(path)
+        if format is None:
+            raise CommandError("Cannot guess the archive format, use --format.")
+        if path == "-" and format == "zip":
+            raise CommandError("Zip archives cannot be read from stdin.")
+
+        stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            written, skipped = util.import_entries(
+                read_archive(stream, format),
+                workers=options["workers"],
+                overwrite=not options["skip_existing"],
+            )
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        self.stderr.write(self.style.SUCCESS(f"Imported {written} entries, skipped {skipped}."))
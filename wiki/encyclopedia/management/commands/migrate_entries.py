@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from encyclopedia.models import Entry
+from encyclopedia.render import content_hash
+from encyclopedia.storage import DatabaseBackend, FileSystemBackend
+
+
+class Command(BaseCommand):
+    help = "Copies the Markdown files of the entries directory into the database backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default="entries",
+                            help="Directory of the .md files, relative to the storage root.")
+
+    def handle(self, *args, **options):
+        source = FileSystemBackend(options["directory"])
+        destination = DatabaseBackend()
+
+        # entries already copied with the same content are skipped, so running the command
+        # again does not add a revision to each of them
+        stored = dict(Entry.objects.values_list("title", "version"))
+        imported = skipped = 0
+        for title in source.list_titles():
+            content = source.read(title)
+            if stored.get(title) == content_hash(content):
+                skipped += 1
+                continue
+            destination.write(title, content)
+            imported += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} entries, {skipped} were already up to date."
+        ))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from encyclopedia import util
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the indexes derived from the entries: the full-text search index, "
+            "title suggestions and the link graph. Run it after deploying or after "
+            "changing the entries outside of the wiki.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        util.rebuild_indexes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(util.list_entries())} entries in {time.perf_counter() - started:.1f}s."
+        ))
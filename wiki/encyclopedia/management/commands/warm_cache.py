@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from encyclopedia import util
+from encyclopedia.warmup import prerender
+
+
+class Command(BaseCommand):
+    help = "Renders entries into the render cache, every entry by default."
+
+    def add_arguments(self, parser):
+        parser.add_argument("titles", nargs="*", help="Titles to render.")
+        parser.add_argument("--workers", type=int,
+                            help="Number of processes, one per core by default.")
+
+    def handle(self, *args, **options):
+        titles = options["titles"] or util.list_entries()
+        entries = ((title, util.get_entry(title)) for title in titles)
+        rendered = prerender(entries, workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} entries, {len(titles) - rendered} were already cached."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedEntry',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, unique=True)),
+                ('length', models.PositiveIntegerField()),
+                ('title_length', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=64)),
+                ('positions', models.TextField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='encyclopedia.indexedentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'entry'], name='encyclopedi_term_33ff5c_idx')],
+            },
+        ),
+    ]
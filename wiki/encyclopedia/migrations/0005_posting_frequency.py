@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+def fill_frequency(apps, schema_editor):
+    # computed from the positions of the postings already indexed
+    from encyclopedia.search import weighted_frequency
+
+    Posting = apps.get_model('encyclopedia', 'Posting')
+    postings = Posting.objects.select_related('entry').only('positions', 'entry__title_length')
+    batch = []
+    for posting in postings.iterator(chunk_size=2000):
+        positions = [int(position) for position in posting.positions.split()]
+        posting.frequency = weighted_frequency(positions, posting.entry.title_length)
+        batch.append(posting)
+        if len(batch) == 2000:
+            Posting.objects.bulk_update(batch, ['frequency'])
+            batch = []
+    Posting.objects.bulk_update(batch, ['frequency'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('encyclopedia', '0004_titlesgeneration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posting',
+            name='frequency',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_frequency, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,90 @@
 from django.db import models
+from django.db.models import F
 
-# Create your models here.
+
+# Entries stored by encyclopedia.storage.DatabaseBackend
+class Entry(models.Model):
+    id = models.AutoField(primary_key=True)
+    title = models.CharField(max_length=255, unique=True)
+    content = models.TextField()
+    # hash of the content, used to detect concurrent edits
+    version = models.CharField(max_length=40)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "entries"
+
+    def __str__(self):
+        return f"{self.title}"
+
+class Revision(models.Model):
+    id = models.AutoField(primary_key=True)
+    entry = models.ForeignKey(Entry, on_delete=models.CASCADE, related_name="revisions")
+    content = models.TextField()
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.entry} on {self.creation_date}"
+
+# Single row counting the entries added and removed, the stamp of encyclopedia.storage.DatabaseBackend
+class TitlesGeneration(models.Model):
+    id = models.AutoField(primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        """Returns the counter, read by its primary key."""
+        return cls.objects.filter(id=1).values_list("value", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        """Increments the counter in the database, so concurrent changes add up."""
+        if not cls.objects.filter(id=1).update(value=F("value") + 1):
+            cls.objects.get_or_create(id=1, defaults={"value": 1})
+
+    def __str__(self):
+        return f"{self.value}"
+
+
+# Full-text search index of the entries, maintained by encyclopedia.search
+class IndexedEntry(models.Model):
+    id = models.AutoField(primary_key=True)
+    title = models.CharField(max_length=255, unique=True)
+    length = models.PositiveIntegerField()
+    title_length = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.title}"
+
+class Posting(models.Model):
+    id = models.AutoField(primary_key=True)
+    term = models.CharField(max_length=64)
+    entry = models.ForeignKey(IndexedEntry, on_delete=models.CASCADE, related_name="postings")
+    # space separated token positions, title tokens come first
+    positions = models.TextField()
+    # number of occurrences, those in the title weighted by encyclopedia.search.TITLE_WEIGHT
+    frequency = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['term', 'entry'])]
+
+    def __str__(self):
+        return f"{self.term} in {self.entry}"
+
+
+# Links between entries, maintained by encyclopedia.links
+class Link(models.Model):
+    id = models.AutoField(primary_key=True)
+    source = models.CharField(max_length=255)
+    target = models.CharField(max_length=255)
+    # lowercase target, to match titles regardless of case
+    target_key = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source']),
+            models.Index(fields=['target_key', 'source']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} -> {self.target}"
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import markdown2
+from django.conf import settings
+
+
+# when streaming an entry, blocks are cut at the first blank line after
+# MIN_BLOCK_LINES lines, and never grow past MAX_BLOCK_LINES lines
+MIN_BLOCK_LINES = 50
+MAX_BLOCK_LINES = 500
+
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+def content_hash(content):
+    """
+    Returns the hex digest used to key an entry's Markdown content.
+    """
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Cache of rendered entries keyed by the hash of their Markdown
+    content. Recently used pages are kept in memory up to `max_bytes`
+    of HTML, everything rendered is also written to a sidecar .html
+    file in `directory` so other processes and restarts can reuse it.
+    """
+
+    def __init__(self, max_bytes, directory):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self._size = 0
+        self._digests = {}
+
+    def _sidecar(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.html")
+
+    def _remember(self, digest, html):
+        # must be called with the lock held
+        size = len(html.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if digest in self._pages:
+            self._size -= self._pages.pop(digest)[1]
+        self._pages[digest] = (html, size)
+        self._size += size
+
+        # evict the least recently used pages until we fit the budget again
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._pages.popitem(last=False)
+            self._size -= evicted
+
+    def get(self, digest):
+        """
+        Returns the cached HTML for a content digest, or None.
+        """
+        with self._lock:
+            if digest in self._pages:
+                self._pages.move_to_end(digest)
+                return self._pages[digest][0]
+        try:
+            with open(self._sidecar(digest), encoding="utf-8") as f:
+                html = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._remember(digest, html)
+        return html
+
+    def put(self, digest, html):
+        """
+        Stores the HTML of a content digest in memory and on disk.
+        """
+        with self._lock:
+            self._remember(digest, html)
+
+        # write to a temporary file first so readers never see a partial page
+        path = self._sidecar(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(temporary, path)
+
+    def link(self, title, digest):
+        """
+        Records which digest is the current rendering of a title.
+        """
+        with self._lock:
+            self._digests[title.lower()] = digest
+
+    def invalidate(self, title):
+        """
+        Drops the cached rendering of a title, in memory and on disk.
+        """
+        with self._lock:
+            digest = self._digests.pop(title.lower(), None)
+            if digest is None:
+                return
+            if digest in self._pages:
+                self._size -= self._pages.pop(digest)[1]
+        try:
+            os.remove(self._sidecar(digest))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Empties the in-memory part of the cache.
+        """
+        with self._lock:
+            self._pages.clear()
+            self._digests.clear()
+            self._size = 0
+
+
+render_cache = RenderCache(
+    getattr(settings, "WIKI_RENDER_CACHE_BYTES", 32 * 1024 * 1024),
+    os.path.join(getattr(settings, "WIKI_CACHE_DIR", "cache"), "rendered"),
+)
+
+
+def render_entry(title, content):
+    """
+    Converts the Markdown content of an entry into HTML, reusing the
+    cached rendering when the content did not change.
+    """
+    digest = content_hash(content)
+    html = render_cache.get(digest)
+    if html is None:
+        html = markdown2.markdown(content)
+        render_cache.put(digest, html)
+    render_cache.link(title, digest)
+    return html
+
+
+def iter_blocks(lines):
+    """
+    Groups the lines of a Markdown document into blocks that can be
+    rendered independently: blocks end at blank lines, fenced code is
+    kept together, and no block grows past MAX_BLOCK_LINES (a long
+    code fence is closed and reopened).
+    """
+    block = []
+    fence = None
+    for line in lines:
+        match = FENCE_RE.match(line)
+        if fence is None and match:
+            fence = match.group(1)
+        elif fence is not None and line.strip().startswith(fence):
+            fence = None
+
+        block.append(line)
+        if fence is None and not line.strip() and len(block) >= MIN_BLOCK_LINES:
+            yield "".join(block)
+            block = []
+        elif len(block) >= MAX_BLOCK_LINES:
+            if fence is None:
+                yield "".join(block)
+                block = []
+            else:
+                yield "".join(block) + f"\n{fence}\n"
+                block = [f"{fence}\n"]
+    if block:
+        yield "".join(block)
+
+
+def render_stream(lines):
+    """
+    Renders a Markdown document block by block, yielding HTML as soon
+    as each block is converted. Reference-style links only resolve
+    within their own block.
+    """
+    for block in iter_blocks(lines):
+        if block.strip():
+            yield markdown2.markdown(block)
@@ -0,0 +1,217 @@
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from .models import IndexedEntry, Posting
+
+
+# BM25 parameters and the weight given to terms found in the title
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+
+MAX_TERM_LENGTH = 64
+# shortest prefix a 'word*' query searches, shorter ones match the word only
+MIN_PREFIX_LENGTH = 3
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+_stats_lock = threading.Lock()
+_stats = None
+
+
+def tokenize(text):
+    """
+    Splits a text into lowercase word tokens.
+    """
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text.lower())]
+
+
+def _invalidate_stats():
+    global _stats
+    with _stats_lock:
+        _stats = None
+
+
+def _corpus_stats():
+    """
+    Returns the number of indexed entries and their average length,
+    cached until the index changes.
+    """
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            totals = IndexedEntry.objects.aggregate(count=Count("id"), average=Avg("length"))
+            _stats = (totals["count"], totals["average"] or 0)
+        return _stats
+
+
+def weighted_frequency(positions, title_length):
+    """
+    Returns the number of occurrences of a term at the given positions,
+    those in the title (the first `title_length` tokens) counting
+    TITLE_WEIGHT times.
+    """
+    return sum(TITLE_WEIGHT if position < title_length else 1 for position in positions)
+
+
+def index_entry(title, content):
+    """
+    Adds an entry to the search index, replacing any previous version.
+    """
+    title_tokens = tokenize(title)
+    tokens = title_tokens + tokenize(content)
+
+    positions = defaultdict(list)
+    for position, token in enumerate(tokens):
+        positions[token].append(position)
+
+    with transaction.atomic():
+        IndexedEntry.objects.filter(title=title).delete()
+        entry = IndexedEntry.objects.create(
+            title=title, length=len(tokens), title_length=len(title_tokens)
+        )
+        Posting.objects.bulk_create([
+            Posting(
+                term=term,
+                entry=entry,
+                positions=" ".join(str(position) for position in found),
+                frequency=weighted_frequency(found, len(title_tokens)),
+            )
+            for term, found in positions.items()
+        ])
+    _invalidate_stats()
+
+
+def remove_entry(title):
+    """
+    Removes an entry from the search index.
+    """
+    IndexedEntry.objects.filter(title=title).delete()
+    _invalidate_stats()
+
+
+def rebuild(entries):
+    """
+    Rebuilds the whole index from an iterable of (title, content) pairs.
+    """
+    with transaction.atomic():
+        Posting.objects.all().delete()
+        IndexedEntry.objects.all().delete()
+        for title, content in entries:
+            index_entry(title, content)
+    _invalidate_stats()
+
+
+def is_built():
+    """
+    Returns True once at least one entry has been indexed.
+    """
+    return IndexedEntry.objects.exists()
+
+
+def parse_query(query):
+    """
+    Splits a query into clauses. Quoted text becomes a phrase clause,
+    words ending with '*' become prefix clauses when at least
+    MIN_PREFIX_LENGTH characters long, since shorter prefixes match
+    most of the index.
+    """
+    clauses = []
+    for match in QUERY_RE.finditer(query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            terms = tokenize(phrase)
+            if terms:
+                clauses.append(("phrase", terms))
+            continue
+        terms = tokenize(word)
+        for number, term in enumerate(terms):
+            prefix = (word.endswith("*") and number == len(terms) - 1
+                      and len(term) >= MIN_PREFIX_LENGTH)
+            clauses.append(("prefix" if prefix else "term", [term]))
+    return clauses
+
+
+def _postings(clause):
+    """
+    Returns {entry id: [(term, frequency, positions)]} for the postings
+    of a clause. Only phrases need the positions of their terms, the
+    other clauses do not read them and get None.
+    """
+    kind, terms = clause
+    if kind == "prefix":
+        postings = Posting.objects.filter(term__gte=terms[0], term__lt=terms[0] + "\uffff")
+    else:
+        postings = Posting.objects.filter(term__in=set(terms))
+
+    found = defaultdict(list)
+    if kind == "phrase":
+        for entry_id, term, frequency, positions in postings.values_list(
+                "entry_id", "term", "frequency", "positions"):
+            found[entry_id].append((term, frequency, [int(position) for position in positions.split()]))
+    else:
+        for entry_id, term, frequency in postings.values_list("entry_id", "term", "frequency"):
+            found[entry_id].append((term, frequency, None))
+    return found
+
+
+def _has_phrase(terms, postings):
+    # the phrase matches when each term follows the previous one
+    positions = {term: found for term, _, found in postings}
+    if not all(term in positions for term in terms):
+        return False
+    starts = set(positions[terms[0]])
+    for offset, term in enumerate(terms[1:], start=1):
+        starts &= {position - offset for position in positions[term]}
+        if not starts:
+            return False
+    return True
+
+
+def search(query, limit=50):
+    """
+    Returns the titles of the entries matching every clause of the
+    query, best BM25 score first.
+    """
+    clauses = parse_query(query)
+    if not clauses:
+        return []
+
+    # fetch the postings of each clause and intersect them, starting
+    # from the rarest clause
+    matched = sorted(((clause, _postings(clause)) for clause in clauses),
+                     key=lambda pair: len(pair[1]))
+    candidates = set(matched[0][1])
+    for _, found in matched[1:]:
+        candidates &= found.keys()
+
+    # phrase clauses also need their terms next to each other
+    for (kind, terms), found in matched:
+        if kind == "phrase":
+            candidates = {entry_id for entry_id in candidates
+                          if _has_phrase(terms, found[entry_id])}
+    if not candidates:
+        return []
+
+    entries = IndexedEntry.objects.in_bulk(candidates)
+    count, average = _corpus_stats()
+
+    scores = defaultdict(float)
+    for _, found in matched:
+        idf = math.log(1 + (count - len(found) + 0.5) / (len(found) + 0.5))
+        for entry_id in candidates:
+            entry = entries.get(entry_id)
+            if entry is None:
+                continue
+            frequency = sum(weight for _, weight, _ in found[entry_id])
+            norm = K1 * (1 - B + B * entry.length / average) if average else K1
+            scores[entry_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [entries[entry_id].title for entry_id, _ in best]
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Entry, TitlesGeneration
+
+
+# the database backend changes existing entries with update(), so only new entries,
+# admin edits (which may rename them) and deletions get here
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+def bump_titles_generation(sender, **kwargs):
+    TitlesGeneration.bump()
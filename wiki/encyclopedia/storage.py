@@ -0,0 +1,372 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .models import Entry, Revision, TitlesGeneration
+from .render import content_hash
+
+
+# bytes read at a time when hashing an entry file
+HASH_CHUNK_SIZE = 64 * 1024
+
+# file of the entries directory recording the titles added by the wiki, see FileSystemBackend.stamp
+TITLES_FILE = ".titles"
+
+# what conditional requests need to know about an entry, without its content
+EntryStat = namedtuple("EntryStat", ["version", "modified", "size"])
+
+
+class EntryConflict(Exception):
+    """
+    Raised when saving an entry that changed since the version the new
+    content was based on.
+    """
+
+
+class EntryExists(Exception):
+    """
+    Raised when creating an entry whose title, regardless of case, is
+    already taken.
+    """
+
+
+_locks = defaultdict(threading.Lock)
+_locks_lock = threading.Lock()
+
+
+@contextmanager
+def _lock(key):
+    # serializes the holders of a key, between threads and, where file
+    # locks are available, between worker processes
+    with _locks_lock:
+        lock = _locks[key]
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        directory = os.path.join(getattr(settings, "WIKI_CACHE_DIR", "cache"), "locks")
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        with open(os.path.join(directory, f"{name}.lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_lock(title):
+    """
+    Serializes writers of the same title, between threads and, where
+    file locks are available, between worker processes.
+    """
+    return _lock(title.lower())
+
+
+class FileSystemBackend:
+    """
+    Stores each entry as a Markdown file in the entries directory of
+    the default storage.
+    """
+
+    def __init__(self, directory="entries"):
+        self.directory = directory
+        # title -> (file mtime and size, content hash), so unchanged files
+        # do not have to be read again to know their version
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+
+    def _filename(self, title):
+        return f"{self.directory}/{title}.md"
+
+    def stamp(self):
+        """
+        Returns a value that changes whenever titles are added or removed,
+        or None when changes cannot be detected.
+
+        Replacing an entry changes the modification time of the directory
+        as much as adding one does, so the writes of the wiki record the
+        time they leave in the titles file, along with a counter bumped
+        when they add a title. Only a different time, a file added or
+        removed from outside, makes the directory time part of the stamp.
+        """
+        # storages without a local path cannot be watched
+        try:
+            path = default_storage.path(self.directory)
+        except NotImplementedError:
+            return None
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return (0, 0)
+        generation, recorded = self._read_titles_file(path)
+        return (generation, None if modified == recorded else modified)
+
+    def _read_titles_file(self, path):
+        # (titles counter, directory time after the last write), (0, None) if unknown
+        try:
+            with open(os.path.join(path, TITLES_FILE), "rb") as f:
+                generation, recorded = f.read().split()
+            return int(generation), int(recorded)
+        except (FileNotFoundError, ValueError):
+            return 0, None
+
+    def list_titles(self):
+        """
+        Returns the sorted list of titles.
+        """
+        try:
+            _, filenames = default_storage.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(re.sub(r"\.md$", "", filename)
+                      for filename in filenames if filename.endswith(".md"))
+
+    def read(self, title):
+        """
+        Returns the content of an entry, or None if it does not exist.
+        """
+        try:
+            with default_storage.open(self._filename(title)) as f:
+                return f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def size(self, title):
+        """
+        Returns the size of an entry in bytes, or None if it does not exist.
+        """
+        try:
+            return default_storage.size(self._filename(title))
+        except FileNotFoundError:
+            return None
+
+    def stat(self, title):
+        """
+        Returns the EntryStat of an entry, or None if it does not exist.
+        The file is only hashed again when it changed since last time.
+        """
+        filename = self._filename(title)
+        try:
+            stat = os.stat(default_storage.path(filename))
+            key = (stat.st_mtime_ns, stat.st_size)
+            modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+            size = stat.st_size
+        except NotImplementedError:
+            if not default_storage.exists(filename):
+                return None
+            modified = default_storage.get_modified_time(filename)
+            size = default_storage.size(filename)
+            key = (modified, size)
+        except FileNotFoundError:
+            return None
+
+        with self._versions_lock:
+            cached = self._versions.get(title)
+        if cached is not None and cached[0] == key:
+            return EntryStat(cached[1], modified, size)
+
+        version = self._hash_file(filename)
+        if version is None:
+            return None
+        with self._versions_lock:
+            self._versions[title] = (key, version)
+        return EntryStat(version, modified, size)
+
+    def _hash_file(self, filename):
+        """
+        Returns the content_hash of a file, reading it in chunks so large
+        entries are never held in memory, or None if it does not exist.
+        The file holds the UTF-8 encoding of the content, so hashing its
+        bytes gives the same digest as hashing the decoded text.
+        """
+        digest = hashlib.sha1()
+        try:
+            with default_storage.open(filename, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            return None
+        return digest.hexdigest()
+
+    def open(self, title):
+        """
+        Returns an iterator over the lines of an entry, read lazily, or
+        None if it does not exist.
+        """
+        try:
+            f = default_storage.open(self._filename(title))
+        except FileNotFoundError:
+            return None
+        return io.TextIOWrapper(f, encoding="utf-8")
+
+    def write(self, title, content, version=None):
+        """
+        Replaces an entry. With a `version`, raises EntryConflict unless
+        the entry is still at that version.
+        """
+        if version is None:
+            self._write_file(title, content)
+        else:
+            with write_lock(title):
+                current = self.read(title)
+                if (content_hash(current) if current is not None else None) != version:
+                    raise EntryConflict(f"The page '{title}' was modified by someone else")
+                self._write_file(title, content)
+        with self._versions_lock:
+            self._versions.pop(title, None)
+
+    def _write_file(self, title, content):
+        """
+        Replaces the file of an entry in a single rename so readers see
+        either the old or the new content, never a missing or partial
+        file. The file is written in a subdirectory first, so only the
+        rename changes the entries directory.
+        """
+        filename = self._filename(title)
+        try:
+            path = default_storage.path(filename)
+        except NotImplementedError:
+            # remote storages have no rename, fall back to delete + save
+            if default_storage.exists(filename):
+                default_storage.delete(filename)
+            default_storage.save(filename, ContentFile(content))
+            return
+
+        directory = os.path.dirname(path)
+        temporary_directory = os.path.join(directory, ".tmp")
+        os.makedirs(temporary_directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=temporary_directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temporary, default_storage.file_permissions_mode or 0o644)
+            self._replace(temporary, path, directory)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+
+    def _replace(self, temporary, path, directory):
+        # renames the file and records the directory time it leaves, see stamp()
+        titles_file = os.path.join(directory, TITLES_FILE)
+        with _lock("\0" + directory):
+            # created once, its later updates are written in place
+            if not os.path.exists(titles_file):
+                open(titles_file, "ab").close()
+            generation, recorded = self._read_titles_file(directory)
+            before = os.stat(directory).st_mtime_ns
+            created = not os.path.exists(path)
+            os.replace(temporary, path)
+            after = os.stat(directory).st_mtime_ns
+
+            # a title was added, or the directory changed from outside since the last write
+            if created or before != recorded:
+                generation += 1
+            with open(titles_file, "r+b") as f:
+                f.write(f"{generation:020d} {after:020d}\n".encode("ascii"))
+
+    def revisions(self, title):
+        """
+        Files keep no history, only the current content is returned.
+        """
+        content = self.read(title)
+        return [content] if content is not None else []
+
+
+class DatabaseBackend:
+    """
+    Stores the entries and every previous revision of them in the
+    database, with the titles indexed.
+    """
+
+    def stamp(self):
+        # bumped whenever an entry is added, renamed or deleted (see signals), a single row to read
+        return TitlesGeneration.current()
+
+    def list_titles(self):
+        return list(Entry.objects.order_by("title").values_list("title", flat=True))
+
+    def read(self, title):
+        return Entry.objects.filter(title=title).values_list("content", flat=True).first()
+
+    def size(self, title):
+        # characters rather than bytes, close enough to pick a rendering mode
+        return (Entry.objects.filter(title=title)
+                .annotate(size=Length("content")).values_list("size", flat=True).first())
+
+    def stat(self, title):
+        entry = (Entry.objects.filter(title=title)
+                 .annotate(size=Length("content"))
+                 .values_list("version", "updated", "size").first())
+        return EntryStat(*entry) if entry is not None else None
+
+    def open(self, title):
+        content = self.read(title)
+        return io.StringIO(content) if content is not None else None
+
+    def write(self, title, content, version=None):
+        new_version = content_hash(content)
+
+        with transaction.atomic():
+            entries = Entry.objects.filter(title=title)
+            if version is not None:
+                # compare-and-swap, only replace the content still at the expected version
+                entries = entries.filter(version=version)
+
+            if not entries.update(content=content, version=new_version, updated=timezone.now()):
+                if version is not None:
+                    raise EntryConflict(f"The page '{title}' was modified by someone else")
+                try:
+                    with transaction.atomic():
+                        Entry.objects.create(title=title, content=content, version=new_version)
+                except IntegrityError:
+                    # created by another writer in the meantime
+                    Entry.objects.filter(title=title).update(
+                        content=content, version=new_version, updated=timezone.now()
+                    )
+
+            entry_id = Entry.objects.filter(title=title).values_list("id", flat=True).get()
+            Revision.objects.create(entry_id=entry_id, content=content)
+
+    def revisions(self, title):
+        """
+        Returns the contents of an entry, most recent first.
+        """
+        return list(Revision.objects.filter(entry__title=title)
+                    .order_by("-id").values_list("content", flat=True))
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Returns the storage backend selected by WIKI_STORAGE_BACKEND.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "WIKI_STORAGE_BACKEND", "encyclopedia.storage.FileSystemBackend")
+        _backend = import_string(path)()
+    return _backend
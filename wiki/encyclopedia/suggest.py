@@ -0,0 +1,101 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+
+# share of the query trigrams a title must contain to be suggested
+MIN_SHARED = 1 / 3
+
+
+def trigrams(text):
+    """
+    Returns the set of trigrams of a text, padded so that the start and
+    end of the text count as well.
+    """
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Maps each trigram to the ids of the titles containing it, so the
+    titles close to a mistyped query can be found without comparing
+    the query to every title.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = None
+        self._titles = []
+        self._ids = {}
+        self._postings = defaultdict(list)
+
+    def rebuild(self, titles, generation=None):
+        """
+        Replaces the indexed titles.
+        """
+        with self._lock:
+            self._titles = []
+            self._ids = {}
+            self._postings = defaultdict(list)
+            for title in titles:
+                self._add(title)
+            self.generation = generation
+
+    def _add(self, title):
+        # must be called with the lock held
+        if title.lower() in self._ids:
+            return
+        title_id = len(self._titles)
+        self._titles.append(title)
+        self._ids[title.lower()] = title_id
+        for gram in trigrams(title):
+            self._postings[gram].append(title_id)
+
+    def add(self, title):
+        """
+        Adds a title to an already built index.
+        """
+        with self._lock:
+            if self.generation is not None:
+                self._add(title)
+
+    def update(self, titles, generation):
+        """
+        Adds the titles listed since the index was built, and records
+        the generation of the title list they bring it to.
+        """
+        with self._lock:
+            if self.generation is None:
+                return
+            for title in titles:
+                self._add(title)
+            self.generation = generation
+
+    def suggest(self, query, limit=5):
+        """
+        Returns up to `limit` titles closest to the query, best first.
+        """
+        if not query.strip():
+            return []
+        grams = trigrams(query.strip())
+        needed = max(1, math.ceil(MIN_SHARED * len(grams)))
+
+        with self._lock:
+            # a title sharing `needed` trigrams with the query must appear
+            # in at least one of the len(grams) - needed + 1 rarest lists,
+            # so only those are read to find the candidates
+            lists = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            candidates = set()
+            for postings in lists[:len(grams) - needed + 1]:
+                candidates.update(postings)
+            titles = [self._titles[title_id] for title_id in candidates]
+
+        scored = []
+        for title in titles:
+            title_grams = trigrams(title)
+            shared = len(grams & title_grams)
+            if shared >= needed:
+                scored.append((2 * shared / (len(grams) + len(title_grams)), title))
+        return [title for _, title in heapq.nlargest(limit, scored)]
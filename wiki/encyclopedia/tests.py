@@ -1,3 +1,452 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from . import links, search, storage, util
+from .models import Entry, Revision
+from .render import render_cache
+
+
+class WikiTestCase(TestCase):
+    """
+    Runs each test on its own empty entries directory, with the module
+    level indexes emptied before and after.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="wiki-test-")
+        settings = override_settings(
+            MEDIA_ROOT=self.root,
+            WIKI_CACHE_DIR=os.path.join(self.root, "cache"),
+            WIKI_STORAGE_BACKEND="encyclopedia.storage.FileSystemBackend",
+            WIKI_PRERENDER_ON_SAVE=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.root)
+
+        directory = render_cache.directory
+        render_cache.directory = os.path.join(self.root, "cache", "rendered")
+        self.addCleanup(setattr, render_cache, "directory", directory)
+
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        if util._title_index_thread is not None:
+            util._title_index_thread.join()
+        storage._backend = None
+        util.entry_index.clear()
+        util.title_index.rebuild([], None)
+        render_cache.clear()
+        links._built = False
+        search._invalidate_stats()
+
+
+class SaveEntryTestCase(WikiTestCase):
+
+    def test_conflict(self):
+        """Saving over a version that changed meanwhile raises EntryConflict."""
+        util.save_entry("Python", "# Python")
+        version = util.entry_version("Python")
+        util.save_entry("Python", "# Python\n\nEdited by someone else", version)
+
+        with self.assertRaises(util.EntryConflict):
+            util.save_entry("Python", "# Python\n\nMy edit", version)
+        self.assertEqual(util.get_entry("Python"), "# Python\n\nEdited by someone else")
+
+    def test_save_at_current_version(self):
+        util.save_entry("Python", "# Python")
+        util.save_entry("Python", "# Python 3", util.entry_version("Python"))
+
+        self.assertEqual(util.get_entry("Python"), "# Python 3")
+
+    def test_replace_leaves_no_temporary_file(self):
+        """Entries are replaced by a rename, only the final file remains."""
+        util.save_entry("Python", "# Python")
+        util.save_entry("Python", "# Python 3")
+
+        entries = os.path.join(self.root, "entries")
+        self.assertEqual([name for name in os.listdir(entries) if name.endswith(".md")], ["Python.md"])
+        self.assertEqual(os.listdir(os.path.join(entries, ".tmp")), [])
+        self.assertEqual(util.get_entry("Python"), "# Python 3")
+
+    def test_version_matches_content(self):
+        """The version read from the file hash is the one save_entry expects."""
+        util.save_entry("Café", "# Café\n\nAu lait")
+
+        self.assertEqual(util.entry_stat("Café").version, util.entry_version("Café"))
+
+
+
+    def test_create_existing(self):
+        util.save_entry("Python", "# Python")
+
+        with self.assertRaises(util.EntryExists):
+            util.create_entry("python", "# python")
+        self.assertEqual(util.list_entries(), ["Python"])
+
+    def test_concurrent_creation(self):
+        """Titles differing only by case created at the same time make a single entry."""
+        titles = ["Foo", "foo", "FOO", "fOo", "FoO", "foO"]
+        barrier = threading.Barrier(len(titles))
+        failed = []
+
+        def create(title):
+            barrier.wait()
+            try:
+                util.create_entry(title, f"# {title}")
+            except util.EntryExists:
+                failed.append(title)
+
+        threads = [threading.Thread(target=create, args=[title]) for title in titles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(failed), len(titles) - 1)
+        self.assertEqual(len(util.list_entries()), 1)
+
+    def test_new_page_existing(self):
+        util.save_entry("Python", "# Python")
+
+        response = self.client.post("/new_page", {"title": "PYTHON", "content": "# PYTHON"})
+        self.assertContains(response, "already exist")
+        self.assertEqual(util.get_entry("Python"), "# Python")
+
+
+class DatabaseBackendTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        storage._backend = storage.DatabaseBackend()
+
+    def test_conflict(self):
+        """Only the content still at the expected version is replaced."""
+        util.save_entry("Python", "# Python")
+        version = util.entry_version("Python")
+        util.save_entry("Python", "# Python\n\nEdited by someone else", version)
+
+        with self.assertRaises(util.EntryConflict):
+            util.save_entry("Python", "# Python\n\nMy edit", version)
+        with self.assertRaises(util.EntryConflict):
+            util.save_entry("Missing", "# Missing", version)
+        self.assertEqual(util.get_entry("Python"), "# Python\n\nEdited by someone else")
+        self.assertEqual(util.entry_stat("Python").version, util.entry_version("Python"))
+
+    def test_revisions(self):
+        for content in ["# Python", "# Python 2", "# Python 3"]:
+            util.save_entry("Python", content)
+
+        self.assertEqual(util.get_revisions("Python"), ["# Python 3", "# Python 2", "# Python"])
+        self.assertEqual(Entry.objects.count(), 1)
+
+    def test_titles(self):
+        """Titles added or deleted are seen, without listing them again on edits."""
+        util.save_entry("Python", "# Python")
+        self.assertEqual(util.list_entries(), ["Python"])
+        util.save_entry("Django", "# Django")
+        self.assertEqual(util.find_entry("django"), "Django")
+
+        with self.assertNumQueries(1):
+            util.find_entry("python")
+
+        Entry.objects.filter(title="Django").delete()
+        self.assertEqual(util.list_entries(), ["Python"])
+
+    def test_migrate_entries(self):
+        """Migrating twice copies the files once, with a single revision each."""
+        files = storage.FileSystemBackend()
+        files.write("Python", "# Python")
+        files.write("Django", "# Django")
+
+        call_command("migrate_entries", stdout=StringIO())
+        output = StringIO()
+        call_command("migrate_entries", stdout=output)
+
+        self.assertIn("Imported 0 entries, 2 were already up to date.", output.getvalue())
+        self.assertEqual(util.list_entries(), ["Django", "Python"])
+        self.assertEqual(util.get_entry("Python"), "# Python")
+        self.assertEqual(Revision.objects.count(), 2)
+
+        files.write("Python", "# Python 3")
+        call_command("migrate_entries", stdout=StringIO())
+        self.assertEqual(util.get_revisions("Python"), ["# Python 3", "# Python"])
+
+class EntryIndexTestCase(WikiTestCase):
+
+    def test_titles_written_elsewhere(self):
+        """Titles another process added are listed after this one saves."""
+        util.save_entry("A", "# A")
+        util.list_entries()
+        with open(os.path.join(self.root, "entries", "External.md"), "w") as f:
+            f.write("# External")
+        util.save_entry("B", "# B")
+
+        self.assertEqual(util.list_entries(), ["A", "B", "External"])
+        self.assertEqual(util.find_entry("external"), "External")
+
+    def test_edit_keeps_stamp(self):
+        """Replacing an entry does not make the other processes list the titles again."""
+        util.save_entry("A", "# A")
+        stamp = storage.get_backend().stamp()
+        util.save_entry("A", "# A edited")
+        self.assertEqual(storage.get_backend().stamp(), stamp)
+
+        util.save_entry("B", "# B")
+        self.assertNotEqual(storage.get_backend().stamp(), stamp)
+
+class SearchTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        util.save_entry("Python", "# Python\n\nPython is a programming language. Python is fun.")
+        util.save_entry("Django", "# Django\n\nDjango is a web framework written in Python.")
+        util.save_entry("Language", "# Language\n\nA language for programming robots.")
+        util.rebuild_indexes()
+
+    def test_ranking(self):
+        """The entry using the term most often comes first."""
+        self.assertEqual(util.search_entries("python"), ["Python", "Django"])
+
+    def test_phrase(self):
+        """Quoted words must appear together and in order."""
+        self.assertEqual(util.search_entries('"programming language"'), ["Python"])
+        self.assertEqual(util.search_entries('"language programming"'), [])
+
+    def test_prefix(self):
+        """Words ending with '*' match as a prefix."""
+        self.assertEqual(util.search_entries("web frame*"), ["Django"])
+        self.assertEqual(set(util.search_entries("prog*")), {"Python", "Language"})
+
+    def test_words_are_not_prefixes(self):
+        self.assertEqual(util.search_entries("web frame"), [])
+        self.assertEqual(util.search_entries("pr*"), [])
+
+    def test_new_entry_is_indexed(self):
+        util.save_entry("Flask", "# Flask\n\nA small web framework.")
+
+        self.assertEqual(set(util.search_entries("framework")), {"Django", "Flask"})
+
+
+class SuggestTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for title in ["Python", "Django", "Git", "HTML"]:
+            util.save_entry(title, f"# {title}")
+        util.rebuild_indexes()
+
+    def test_suggestions(self):
+        """Mistyped titles suggest the closest ones first."""
+        self.assertEqual(util.suggest_entries("Pyhton")[0], "Python")
+        self.assertEqual(util.suggest_entries("djnago")[0], "Django")
+
+    def test_nothing_close(self):
+        self.assertEqual(util.suggest_entries("zzzzzz"), [])
+
+    def test_titles_added_elsewhere(self):
+        """Titles another process added are indexed without rebuilding the index."""
+        with open(os.path.join(self.root, "entries", "Haskell.md"), "w") as f:
+            f.write("# Haskell")
+        with mock.patch.object(util.title_index, "rebuild") as rebuild:
+            self.assertEqual(util.suggest_entries("Haskel")[0], "Haskell")
+        rebuild.assert_not_called()
+
+    def test_built_in_background(self):
+        """The first call of a process suggests nothing and indexes the titles in a thread."""
+        util.title_index.rebuild([], None)
+
+        self.assertEqual(util.suggest_entries("Pyhton"), [])
+        util._title_index_thread.join()
+        self.assertEqual(util.suggest_entries("Pyhton")[0], "Python")
+
+
+
+class LinksTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        util.save_entry("Python", "# Python\n\nSee [Django](/wiki/Django) and [Ruby](/wiki/Ruby).")
+        util.save_entry("Django", "# Django\n\nWritten in [python](/wiki/python).")
+        util.save_entry("Git", "# Git")
+
+    def test_not_built(self):
+        """Until rebuild_indexes ran, nothing is read to answer."""
+        self.assertFalse(util.links_built())
+        self.assertEqual(util.backlinks("Python"), [])
+        self.assertEqual(util.orphan_entries(), [])
+        self.assertEqual(util.broken_links(), [])
+
+    def test_graph(self):
+        util.rebuild_indexes()
+
+        self.assertEqual(util.backlinks("Python"), ["Django"])
+        self.assertEqual(util.backlinks("django"), ["Python"])
+        self.assertEqual(util.orphan_entries(), ["Git"])
+        self.assertEqual(util.broken_links(), [("Python", "Ruby")])
+
+    def test_save_updates_links(self):
+        util.rebuild_indexes()
+        util.save_entry("Git", "# Git\n\nUsed by [Ruby](/wiki/Ruby) people.")
+        util.save_entry("Ruby", "# Ruby")
+
+        self.assertEqual(util.backlinks("Ruby"), ["Git", "Python"])
+        self.assertEqual(util.orphan_entries(), ["Git"])
+        self.assertEqual(util.broken_links(), [])
+
+    def test_broken_links_query_count(self):
+        """Broken links are found without looking each target up."""
+        util.rebuild_indexes()
+        util.save_entry("Git", "".join(f"[{i}](/wiki/Missing{i}) " for i in range(50)))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(util.broken_links()), 51)
+
+class IndexPageTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for title in ["A", "B", "C", "D", "E"]:
+            util.save_entry(title, f"# {title}")
+
+    def test_first_page(self):
+        self.assertEqual(util.list_entries_page(limit=2), (["A", "B"], False, True))
+
+    def test_after(self):
+        """A page after a title starts right after it."""
+        self.assertEqual(util.list_entries_page(after="B", limit=2), (["C", "D"], True, True))
+        self.assertEqual(util.list_entries_page(after="D", limit=2), (["E"], True, False))
+
+    def test_before(self):
+        """A page before a title ends right before it."""
+        self.assertEqual(util.list_entries_page(before="E", limit=2), (["C", "D"], True, True))
+        self.assertEqual(util.list_entries_page(before="B", limit=2), (["A"], False, True))
+
+    def test_start(self):
+        self.assertEqual(util.list_entries_page(start="C", limit=10), (["C", "D", "E"], True, False))
+
+    def test_index_view(self):
+        """The index view links the pages around the titles it shows."""
+        with mock.patch("encyclopedia.views.INDEX_PAGE_SIZE", 2):
+            response = self.client.get("/", {"after": "B"})
+
+        self.assertEqual(response.context["entries"], ["C", "D"])
+        self.assertEqual(response.context["previous"], "C")
+        self.assertEqual(response.context["next"], "D")
+
+
+class CanonicalRedirectTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        util.save_entry("Python", "# Python")
+
+    def test_entry(self):
+        response = self.client.get("/wiki/python")
+
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/wiki/Python")
+        self.assertEqual(self.client.get("/wiki/Python").status_code, 200)
+
+    def test_edit_keeps_query_string(self):
+        response = self.client.get("/edit/PYTHON", {"from": "search", "q": "a b"})
+
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/edit/Python?from=search&q=a+b")
+
+    def test_edit_saves_canonical_title(self):
+        self.client.post("/edit/python", {"content": "# Python 3"})
+
+        self.assertEqual(util.list_entries(), ["Python"])
+        self.assertEqual(util.get_entry("Python"), "# Python 3")
+
+    def test_missing_entry(self):
+        response = self.client.get("/wiki/Ruby")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "does not exist")
+
+    def test_search_exact_title(self):
+        response = self.client.get("/search", {"q": "  PYTHON "})
+
+        self.assertRedirects(response, "/wiki/Python", fetch_redirect_response=False)
+
+
+class ConditionalGetTestCase(WikiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        util.save_entry("Python", "# Python")
+        self.response = self.client.get("/wiki/Python")
+
+    def test_validators(self):
+        self.assertEqual(self.response.status_code, 200)
+        self.assertEqual(self.response["ETag"], f'"{util.entry_version("Python")}"')
+        self.assertIn("Last-Modified", self.response)
+
+    def test_if_none_match(self):
+        """A client holding the current version gets a 304, without the entry being read."""
+        with mock.patch.object(util, "get_entry") as get_entry:
+            response = self.client.get("/wiki/Python", HTTP_IF_NONE_MATCH=self.response["ETag"])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.response["ETag"])
+        get_entry.assert_not_called()
+
+    def test_if_modified_since(self):
+        response = self.client.get("/wiki/Python", HTTP_IF_MODIFIED_SINCE=self.response["Last-Modified"])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_entry(self):
+        util.save_entry("Python", "# Python 3")
+        response = self.client.get("/wiki/Python", HTTP_IF_NONE_MATCH=self.response["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.response["ETag"])
+        self.assertContains(response, "Python 3")
+
+
+class ArchiveTestCase(WikiTestCase):
+
+    entries = {"Python": "# Python\n\nSnakes", "Café": "# Café\n\nAu lait", "Empty": ""}
+
+    def setUp(self):
+        super().setUp()
+        for title, content in self.entries.items():
+            util.save_entry(title, content)
+
+    def test_round_trip(self):
+        """Entries exported in each format are imported back as they were."""
+        for name in ["entries.tar.gz", "entries.zip", "entries.jsonl"]:
+            with self.subTest(name):
+                path = os.path.join(self.root, name)
+                call_command("export_entries", path, stderr=StringIO())
+                shutil.rmtree(os.path.join(self.root, "entries"))
+                self.reset()
+
+                call_command("import_entries", path, stderr=StringIO())
+                self.assertEqual(util.list_entries(), sorted(self.entries))
+                for title, content in self.entries.items():
+                    self.assertEqual(util.get_entry(title), content)
+
+    def test_import_keeps_existing_titles(self):
+        """Titles are matched regardless of case, the first one of the archive wins."""
+        archive = [("python", "# New"), ("PYTHON", "# Newer"), ("Django", "# Django")]
+
+        self.assertEqual(util.import_entries(archive), (2, 1))
+        self.assertEqual(util.list_entries(), ["Café", "Django", "Empty", "Python"])
+        self.assertEqual(util.get_entry("Python"), "# New")
+        self.assertEqual(util.search_entries("django"), ["Django"])
+
+    def test_skip_existing(self):
+        self.assertEqual(util.import_entries([("python", "# New")], overwrite=False), (0, 1))
+        self.assertEqual(util.get_entry("Python"), self.entries["Python"])
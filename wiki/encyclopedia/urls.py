@@ -5,8 +5,11 @@ from . import views
 urlpatterns = [
     path("", views.index, name="index"),
     path("wiki/<str:title>", views.entry, name="entry"),
+    path("wiki/<str:title>/links", views.backlinks, name="backlinks"),
     path("search", views.search, name="search"),
+    path("suggest", views.suggest, name="suggest"),
     path("new_page", views.new_page, name="new_page"),
     path("edit/<str:title>", views.edit, name="edit"),
-    path("random", views.random_page, name="random_page")
+    path("random", views.random_page, name="random_page"),
+    path("maintenance", views.maintenance, name="maintenance")
 ]
@@ -1,28 +1,260 @@
-import re
+import bisect
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import links, search, warmup
+from .render import content_hash, render_cache
+from .storage import DatabaseBackend, EntryConflict, EntryExists, get_backend, write_lock
+from .suggest import TrigramIndex
+
+
+class EntryIndex:
+    """
+    In-process index of the encyclopedia titles. Keeps the sorted list
+    of titles and a lowercase -> canonical title map, and only lists the
+    storage backend again when its stamp (see the stamp() of each
+    backend) changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._generation = 0
+        self._titles = []
+        self._lookup = {}
+        self._buckets = set()
+        # generation -> titles it listed that the previous one did not have
+        self._added = {}
+        self._loaded = False
+
+    def _refresh(self):
+        # must be called with the lock held
+        backend = get_backend()
+        stamp = backend.stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+        titles = backend.list_titles()
+        if self._loaded:
+            self._added[self._generation + 1] = [title for title in titles
+                                                 if title.lower() not in self._lookup]
+            self._added.pop(self._generation + 1 - ADDED_GENERATIONS, None)
+        self._titles = titles
+        self._lookup = {title.lower(): title for title in self._titles}
+        self._buckets = {title[0] for title in self._titles if title}
+        self._stamp = stamp
+        self._generation += 1
+        self._loaded = True
+
+    def titles(self):
+        """
+        Returns the sorted list of titles.
+        """
+        with self._lock:
+            self._refresh()
+            return list(self._titles)
+
+    def page(self, start="", after=None, before=None, limit=100):
+        """
+        Returns `limit` sorted titles, with whether there are titles
+        before and after them. The page begins at the first title >=
+        `start`, or right after the title `after`, or ends right before
+        the title `before`. Only the page itself is copied.
+        """
+        with self._lock:
+            self._refresh()
+            if before is not None:
+                end = bisect.bisect_left(self._titles, before)
+                begin = max(0, end - limit)
+            else:
+                if after is not None:
+                    begin = bisect.bisect_right(self._titles, after)
+                else:
+                    begin = bisect.bisect_left(self._titles, start)
+                end = begin + limit
+            return self._titles[begin:end], begin > 0, end < len(self._titles)
+
+    def buckets(self):
+        """
+        Returns the sorted first characters of the titles.
+        """
+        with self._lock:
+            self._refresh()
+            return sorted(self._buckets)
+
+    def generation(self):
+        """
+        Returns a counter bumped every time the titles are listed again,
+        so derived indexes know when to rebuild. Titles recorded with
+        add() do not change it.
+        """
+        with self._lock:
+            self._refresh()
+            return self._generation
+
+    def added_since(self, generation):
+        """
+        Returns the titles listed since `generation` and the current
+        generation, so derived indexes can add them instead of starting
+        over. The titles are None when that generation is too old.
+        """
+        with self._lock:
+            self._refresh()
+            added = []
+            for number in range(generation + 1, self._generation + 1):
+                if number not in self._added:
+                    return None, self._generation
+                added.extend(self._added[number])
+            return added, self._generation
+
+    def lookup(self, title):
+        """
+        Returns the canonical title matching `title` case-insensitively,
+        or None if there is no such entry.
+        """
+        with self._lock:
+            self._refresh()
+            return self._lookup.get(title.lower())
+
+    def random(self):
+        """
+        Returns a random title, or None if there are no entries. The
+        title list is sampled in place, without copying or sorting it.
+        """
+        with self._lock:
+            self._refresh()
+            return random.choice(self._titles) if self._titles else None
+
+    def add(self, title, stamp):
+        """
+        Records a title that was just written, without listing all the
+        entries again. `stamp` is the backend stamp read before the
+        write: unless the titles were listed at that stamp, other titles
+        were added meanwhile and the next access lists them again.
+        """
+        with self._lock:
+            # nothing loaded yet, the next access will scan anyway
+            if self._stamp is None:
+                return
+            if stamp != self._stamp:
+                self._stamp = None
+                return
+            if title.lower() not in self._lookup:
+                bisect.insort(self._titles, title)
+                self._lookup[title.lower()] = title
+                self._buckets.update(title[:1])
+            self._stamp = get_backend().stamp()
+
+    def clear(self):
+        """
+        Forgets the cached titles, forcing a rescan on next access.
+        """
+        with self._lock:
+            self._stamp = None
+            self._titles = []
+            self._lookup = {}
+            self._buckets = set()
+            self._added = {}
+            self._loaded = False
+
+
+# number of title listings whose new titles EntryIndex remembers
+ADDED_GENERATIONS = 64
+
+entry_index = EntryIndex()
+title_index = TrigramIndex()
+
+_title_index_lock = threading.Lock()
+_title_index_thread = None
 
 
 def list_entries():
     """
     Returns a list of all names of encyclopedia entries.
     """
-    _, filenames = default_storage.listdir("entries")
-    return list(sorted(re.sub(r"\.md$", "", filename)
-                for filename in filenames if filename.endswith(".md")))
+    return entry_index.titles()
+
+
+def list_entries_page(start="", after=None, before=None, limit=100):
+    """
+    Returns a page of entry titles, see EntryIndex.page.
+    """
+    return entry_index.page(start, after, before, limit)
+
+
+def entry_buckets():
+    """
+    Returns the first characters of the entry titles, to navigate the
+    list alphabetically.
+    """
+    return entry_index.buckets()
+
+
+def find_entry(title):
+    """
+    Returns the existing entry title matching `title` regardless of
+    case, or None if no such entry exists.
+    """
+    return entry_index.lookup(title)
+
+
+def random_entry():
+    """
+    Returns the title of a random entry, or None if there are none.
+    """
+    return entry_index.random()
+
+
+def entry_version(title):
+    """
+    Returns the version of an entry (the hash of its content) to pass
+    back to save_entry, or None if no such entry exists.
+    """
+    content = get_entry(title)
+    return content_hash(content) if content is not None else None
 
 
-def save_entry(title, content):
+def save_entry(title, content, version=None):
     """
     Saves an encyclopedia entry, given its title and Markdown
     content. If an existing entry with the same title already exists,
     it is replaced.
+
+    When `version` is given the entry is only replaced if it is still
+    at that version, otherwise EntryConflict is raised.
+    """
+    backend = get_backend()
+    stamp = backend.stamp()
+    backend.write(title, content, version)
+
+    entry_index.add(title, stamp)
+    title_index.add(title)
+    render_cache.invalidate(title)
+    if getattr(settings, "WIKI_PRERENDER_ON_SAVE", False):
+        warmup.schedule(title, content)
+    # until the indexes are built (rebuild_indexes, an import) there is nothing to update
+    if search.is_built():
+        search.index_entry(title, content)
+    if links.is_built():
+        links.update_links(title, content)
+
+
+def create_entry(title, content):
+    """
+    Saves a new encyclopedia entry. Raises EntryExists if an entry
+    with the same title regardless of case exists, including one
+    another worker is creating: the title is looked up again while
+    holding the write lock of its lowercase form.
     """
-    filename = f"entries/{title}.md"
-    if default_storage.exists(filename):
-        default_storage.delete(filename)
-    default_storage.save(filename, ContentFile(content))
+    with write_lock(title):
+        existing = find_entry(title)
+        if existing is not None:
+            raise EntryExists(f"The page '{existing}' already exist!")
+        save_entry(title, content)
 
 
 def get_entry(title):
@@ -30,8 +262,183 @@ def get_entry(title):
     Retrieves an encyclopedia entry by its title. If no such
     entry exists, the function returns None.
     """
+    return get_backend().read(title)
+
+
+def entry_stat(title):
+    """
+    Returns the version, modification date and size of an entry
+    without reading it when possible, or None if no such entry exists.
+    """
+    return get_backend().stat(title)
+
+
+def entry_size(title):
+    """
+    Returns the size of an entry, or None if no such entry exists.
+    """
+    return get_backend().size(title)
+
+
+def open_entry(title):
+    """
+    Returns an iterator over the lines of an entry, read as they are
+    consumed, or None if no such entry exists. The caller closes it.
+    """
+    return get_backend().open(title)
+
+
+def get_revisions(title):
+    """
+    Returns the successive contents of an entry, most recent first.
+    """
+    return get_backend().revisions(title)
+
+
+def search_entries(query):
+    """
+    Returns the titles of the entries matching a full-text query,
+    most relevant first. Building the search index takes a while on a
+    large wiki, so it is never done here: until the rebuild_indexes
+    command (or an import) built it, the titles containing the query
+    are returned instead.
+    """
+    if not search.is_built():
+        query = query.lower()
+        return [title for title in list_entries() if query in title.lower()]
+    return search.search(query)
+
+
+def suggest_entries(query, limit=5):
+    """
+    Returns the titles closest to a possibly mistyped query. Indexing
+    every title takes a while on a large wiki, so it is never done
+    here: the first call of a process starts it in a background thread
+    (unless rebuild_indexes did it) and suggests nothing until it is
+    done, then the titles listed since are added as they appear.
+    """
+    if title_index.generation is None:
+        _build_title_index()
+        return []
+    added, generation = entry_index.added_since(title_index.generation)
+    if added is None:
+        # too many listings ago, keep serving the index while it is rebuilt
+        _build_title_index()
+    elif generation != title_index.generation:
+        title_index.update(added, generation)
+    # titles removed since are still indexed
+    return [title for title in title_index.suggest(query, limit) if find_entry(title) == title]
+
+
+def _build_title_index():
+    # one background rebuild of the title index at a time
+    global _title_index_thread
+    with _title_index_lock:
+        if _title_index_thread is not None and _title_index_thread.is_alive():
+            return
+        _title_index_thread = threading.Thread(target=_rebuild_title_index,
+                                               name="wiki-title-index", daemon=True)
+        _title_index_thread.start()
+
+
+def _rebuild_title_index():
     try:
-        f = default_storage.open(f"entries/{title}.md")
-        return f.read().decode("utf-8")
-    except FileNotFoundError:
-        return None
+        generation = entry_index.generation()
+        title_index.rebuild(list_entries(), generation)
+    finally:
+        close_old_connections()
+
+
+def rebuild_indexes():
+    """
+    Rebuilds every index derived from the entries: titles, title
+    suggestions and full-text search.
+    """
+    entry_index.clear()
+    title_index.rebuild(list_entries(), entry_index.generation())
+    search.rebuild((title, get_entry(title)) for title in list_entries())
+    links.rebuild((title, get_entry(title)) for title in list_entries())
+
+
+def links_built():
+    """
+    Returns True once the link graph is built. Reading every entry
+    takes a while on a large wiki, so it is never done here: until
+    the rebuild_indexes command (or an import) built it, no entry is
+    linked from anywhere and nothing is reported.
+    """
+    return links.is_built()
+
+
+def backlinks(title):
+    """
+    Returns the titles of the entries linking to an entry.
+    """
+    if not links_built():
+        return []
+    return links.backlinks(title)
+
+
+def orphan_entries():
+    """
+    Returns the titles of the entries no other entry links to.
+    """
+    if not links_built():
+        return []
+    linked = links.linked_keys()
+    return [title for title in list_entries() if title.lower() not in linked]
+
+
+def broken_links():
+    """
+    Returns the (source, target) links pointing to entries that do not exist.
+    """
+    if not links_built():
+        return []
+    existing = {title.lower() for title in list_entries()}
+    return [(source, target) for source, target in links.links()
+            if target.lower() not in existing]
+
+
+def import_entries(entries, workers=8, overwrite=True):
+    """
+    Saves many (title, content) pairs at once and returns how many
+    were written and skipped. Titles are deduplicated regardless of
+    case as they come (the first one wins, an existing entry keeps its
+    title), files are written by a pool of threads, and the indexes
+    are rebuilt once at the end rather than after every entry.
+    """
+    backend = get_backend()
+    seen = set()
+    written = skipped = 0
+
+    # looked up once, every write below would make entry_index rescan the titles
+    existing_titles = {title.lower(): title for title in list_entries()}
+
+    # the database serializes writes anyway, one connection does it faster
+    if isinstance(backend, DatabaseBackend):
+        workers = 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for title, content in entries:
+            key = title.lower()
+            existing = existing_titles.get(key)
+            if key in seen or (existing and not overwrite):
+                skipped += 1
+                continue
+            seen.add(key)
+            title = existing or title
+
+            pending.append(executor.submit(backend.write, title, content))
+            render_cache.invalidate(title)
+            written += 1
+
+            # keep a bounded number of contents in memory
+            while len(pending) > workers * 4:
+                pending.popleft().result()
+        for future in pending:
+            future.result()
+
+    rebuild_indexes()
+    return written, skipped
@@ -1,11 +1,15 @@
 from django import forms
-from django.http import HttpResponseRedirect
+from django.conf import settings
+from django.http import HttpResponsePermanentRedirect, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.urls import reverse
-import markdown2
-import random
+from django.utils.cache import get_conditional_response
+from django.utils.html import escape
+from django.utils.http import http_date, quote_etag
 
 from . import util
+from .render import content_hash, render_entry, render_stream
 
 
 # create new text form for the new page form
@@ -29,13 +33,97 @@ class EditPageForm(forms.Form):
                                 'rows': 20,
                                 'style': 'width: 100%',
                               }))
+    # version of the entry the edit started from, to detect concurrent edits
+    version = forms.CharField(widget=forms.HiddenInput, required=False)
+
+# number of titles listed on each page of the index
+INDEX_PAGE_SIZE = 200
 
 def index(request):
+    # the whole list can be streamed instead of paginated
+    if request.GET.get('stream'):
+        return stream_index(request)
+
+    # keyset pagination: the page starts after (or ends before) a title, or at a letter
+    entries, has_previous, has_next = util.list_entries_page(
+        start=request.GET.get('from', ''),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        limit=INDEX_PAGE_SIZE
+    )
     return render(request, "encyclopedia/index.html", {
-        "entries": util.list_entries()
+        "entries": entries,
+        "buckets": util.entry_buckets(),
+        "previous": entries[0] if has_previous and entries else None,
+        "next": entries[-1] if has_next and entries else None
     })
 
+def stream_index(request):
+    # render the page around a marker, and send the titles in its place
+    marker = "<!-- entries -->"
+    page = render_to_string("encyclopedia/index.html", {
+        "entries": [marker],
+        "streaming": True
+    }, request)
+    head, tail = page.split(marker, 1)
+    entries = util.list_entries()
+
+    def content():
+        yield head
+        for begin in range(0, len(entries), 1000):
+            yield "".join(
+                f'<li><a href="{escape(reverse("entry", args=[entry]))}">{escape(entry)}</a></li>\n'
+                for entry in entries[begin:begin + 1000]
+            )
+        yield tail
+
+    return StreamingHttpResponse(content())
+
+def canonical_redirect(request, view, title):
+    """
+    Returns a permanent redirect to the URL of the canonical title if
+    `title` is spelled differently, or None.
+    """
+    canonical = util.find_entry(title)
+    if canonical is None or canonical == title:
+        return None
+    url = reverse(view, args=[canonical])
+    if request.GET:
+        url = f"{url}?{request.GET.urlencode()}"
+    return HttpResponsePermanentRedirect(url)
+
 def entry(request, title):
+    # one URL per page, whatever the case used in the link
+    redirect = canonical_redirect(request, 'entry', title)
+    if redirect:
+        return redirect
+
+    stat = util.entry_stat(title)
+
+    # if no entry, render the error page
+    if stat is None:
+        return render(request, "encyclopedia/error.html", {
+            "message": f"The page '{title}' you are looking for does not exist"
+        })
+
+    # answer with a 304 if the client already has this version, without reading the entry
+    etag = quote_etag(stat.version)
+    last_modified = int(stat.modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        # big pages (or ?stream=1) are read and rendered a block at a time
+        if stat.size >= settings.WIKI_STREAM_THRESHOLD or request.GET.get('stream'):
+            response = stream_entry(request, title)
+        else:
+            response = render_page(request, title)
+
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
+
+def render_page(request, title):
     # get the content of the page in an entry variable
     entry = util.get_entry(title)
 
@@ -46,30 +134,69 @@ def entry(request, title):
         })
 
     # if entry, parse the entry content into html and render the page to the page
-    entry = markdown2.markdown(entry)
+    entry = render_entry(title, entry)
     return render(request, "encyclopedia/entry.html", {
         "title": title,
         "entry": entry
     })
 
+def stream_entry(request, title):
+    lines = util.open_entry(title)
+    if lines is None:
+        return render(request, "encyclopedia/error.html", {
+            "message": f"The page '{title}' you are looking for does not exist"
+        })
+
+    # render the page around a marker, and send the entry in its place
+    marker = "<!-- entry -->"
+    page = render_to_string("encyclopedia/entry.html", {
+        "title": title,
+        "entry": marker
+    }, request)
+    head, tail = page.split(marker, 1)
+
+    def content():
+        try:
+            yield head
+            yield from render_stream(lines)
+            yield tail
+        finally:
+            lines.close()
+
+    return StreamingHttpResponse(content())
+
 def edit(request, title):
     if request.method == "POST":
+        # save under the existing title, whatever the case used in the URL
+        title = util.find_entry(title) or title
         form = EditPageForm(request.POST)
         
         if form.is_valid():
             # recuperate the new content from the form
             content = form.cleaned_data["content"]
 
-            # update the entry with the new value
-            util.save_entry(title, content)
+            # update the entry with the new value, unless someone saved it in the meantime
+            try:
+                util.save_entry(title, content, version=form.cleaned_data["version"] or None)
+            except util.EntryConflict:
+                return render(request, "encyclopedia/error.html", {
+                    "message": f"The page '{title}' was modified while you were editing it, please edit it again."
+                })
 
             # redirect to the modified page
             return HttpResponseRedirect(reverse('entry', args=[title]))
 
+    redirect = canonical_redirect(request, 'edit', title)
+    if redirect:
+        return redirect
+
     # recuperate the entry and parse it
     entry = util.get_entry(title)
     # Prepare the form and insert then default value of it's content to the entry content.
-    form = EditPageForm(initial={'content': entry})
+    form = EditPageForm(initial={
+        'content': entry,
+        'version': content_hash(entry) if entry is not None else ''
+    })
     
     return render(request, "encyclopedia/edit.html", {
         "title": title,
@@ -78,9 +205,6 @@ def edit(request, title):
     })
     
 def search(request):
-    # create variable to get all page of the wiki
-    entries = util.list_entries()
-
     # Check GET method
     query = request.GET.get('q')
     
@@ -89,18 +213,20 @@ def search(request):
         # clean the query to make it case unsensitive and ignore additional spaces
         query = query.lower().strip()
         
-        # if exact search:
-        if query in [entry.lower() for entry in entries]:
-            return HttpResponseRedirect(reverse('entry', args=[query]))
-        
-        # If substring of many entries:
-        match = []
-        for entry in entries:
-            if query in entry.lower():
-                match.append(entry)
+        # if exact search, go straight to the page under its canonical title
+        canonical = util.find_entry(query)
+        if canonical:
+            return HttpResponseRedirect(reverse('entry', args=[canonical]))
         
+        # else, rank the entries matching the query in their title or content
+        entries = util.search_entries(query)
+
+        # nothing found, propose the titles closest to what was typed
+        suggestions = util.suggest_entries(query) if not entries else []
+
         return render(request, "encyclopedia/search.html", {
-            "entries": match,
+            "entries": entries,
+            "suggestions": suggestions,
             "query": query
         })
             
@@ -109,9 +235,6 @@ def search(request):
         return HttpResponseRedirect(reverse('index'))
 
 def new_page(request):
-    
-    # create variable to get all page of the wiki
-    entries = util.list_entries()
 
     # check if method == POST
     if request.method == "POST":
@@ -121,21 +244,20 @@ def new_page(request):
 
         # check form validation
         if form.is_valid():
-            print(entries)
 
             # recuperate the datas in variables
             title = form.cleaned_data['title']
             content = form.cleaned_data['content']
 
-            # if page already exists, display an error message
-            if title.lower() in [entry.lower() for entry in entries]:
+            # if page already exists, even created by someone else meanwhile, display an error message
+            try:
+                util.create_entry(title, content)
+            except util.EntryExists:
                 return render(request, "encyclopedia/error.html", {
             "message": f"The page '{title}' already exist!"
             })
 
-            else:
-                util.save_entry(title, content)
-                return HttpResponseRedirect(reverse('entry', args=[title]))
+            return HttpResponseRedirect(reverse('entry', args=[title]))
 
     return render(request, "encyclopedia/new_page.html", {
         "form": NewPageForm()
@@ -143,6 +265,33 @@ def new_page(request):
 
 # generate a random page
 def random_page(request):
-    entries = util.list_entries()
-    choice = random.choice(entries)
-    return HttpResponseRedirect(reverse('entry', args=[choice]))
\ No newline at end of file
+    choice = util.random_entry()
+
+    # empty wiki, nothing to pick from
+    if choice is None:
+        return HttpResponseRedirect(reverse('index'))
+    return HttpResponseRedirect(reverse('entry', args=[choice]))
+
+# entries linking to a page
+def backlinks(request, title):
+    title = util.find_entry(title) or title
+    return render(request, "encyclopedia/backlinks.html", {
+        "title": title,
+        "entries": util.backlinks(title)
+    })
+
+# pages nobody links to and links to pages that do not exist
+def maintenance(request):
+    return render(request, "encyclopedia/maintenance.html", {
+        "built": util.links_built(),
+        "orphans": util.orphan_entries(),
+        "broken_links": util.broken_links()
+    })
+
+# "did you mean" suggestions for a possibly mistyped title
+def suggest(request):
+    query = request.GET.get('q', '')
+    return JsonResponse({
+        "query": query,
+        "suggestions": util.suggest_entries(query)
+    })
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import markdown2
+from django.conf import settings
+
+from .render import content_hash, render_cache
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# uncached entries sent to the pool at a time by prerender, per worker
+BATCH_PER_WORKER = 64
+
+
+def _context():
+    """
+    Returns the multiprocessing context of the pools. Web workers run
+    threads, and forking a process with threads can deadlock the child,
+    so workers are started from a clean forkserver (or spawned where
+    there is none).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=getattr(settings, "WIKI_PRERENDER_WORKERS", None),
+                                        mp_context=_context())
+        return _pool
+
+
+def _store(title, digest):
+    # callback storing a finished rendering in the cache
+    def done(future):
+        if future.exception() is None:
+            render_cache.put(digest, future.result())
+            render_cache.link(title, digest)
+    return done
+
+
+def schedule(title, content):
+    """
+    Renders an entry in the background pool so its next reader finds
+    it in the render cache.
+    """
+    global _pool
+    digest = content_hash(content)
+    try:
+        future = _executor().submit(markdown2.markdown, content)
+    except BrokenProcessPool:
+        # a worker died, start a new pool next time
+        with _pool_lock:
+            _pool = None
+        return
+    future.add_done_callback(_store(title, digest))
+
+
+def prerender(entries, workers=None, chunksize=16):
+    """
+    Renders (title, content) pairs across `workers` processes (one per
+    core by default) and fills the render cache with them. Entries
+    already rendered are skipped. Entries are read and sent to the pool
+    in bounded batches, so only a batch of contents is held in memory.
+    Returns how many were rendered.
+    """
+    workers = workers or os.cpu_count()
+    batch_size = workers * BATCH_PER_WORKER
+    rendered = 0
+
+    def render(executor, batch):
+        pages = executor.map(markdown2.markdown, (content for _, _, content in batch),
+                             chunksize=chunksize)
+        for (title, digest, _), html in zip(batch, pages):
+            render_cache.put(digest, html)
+            render_cache.link(title, digest)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_context()) as executor:
+        batch = []
+        for title, content in entries:
+            if content is None:
+                continue
+            digest = content_hash(content)
+            if render_cache.get(digest) is not None:
+                render_cache.link(title, digest)
+                continue
+            batch.append((title, digest, content))
+            if len(batch) >= batch_size:
+                render(executor, batch)
+                rendered += len(batch)
+                batch = []
+        if batch:
+            render(executor, batch)
+            rendered += len(batch)
+    return rendered
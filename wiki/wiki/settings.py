@@ -119,3 +119,26 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Encyclopedia storage and caches
+
+# Where entries are stored: encyclopedia.storage.FileSystemBackend keeps one
+# .md file per entry, encyclopedia.storage.DatabaseBackend keeps entries and
+# their revisions in the database (import them with `manage.py migrate_entries`)
+WIKI_STORAGE_BACKEND = 'encyclopedia.storage.FileSystemBackend'
+
+# Directory holding generated files (rendered pages, indexes)
+WIKI_CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+
+# Memory budget of the in-process rendered page cache
+WIKI_RENDER_CACHE_BYTES = 32 * 1024 * 1024
+
+# Render saved entries in a background process pool so their next reader
+# hits the cache (`manage.py warm_cache` fills it for the whole wiki), off
+# by default since it starts worker processes next to the web server
+WIKI_PRERENDER_ON_SAVE = False
+WIKI_PRERENDER_WORKERS = 2
+
+# Entries bigger than this (in bytes) are streamed to the client
+WIKI_STREAM_THRESHOLD = 1024 * 1024